@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class EmployeesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'employees'
+
+    def ready(self):
+        from employees import attendance_writer, indexes, metrics, warmup
+        # Before anything creates a MongoClient, so every client is instrumented
+        metrics.start()
+        warmup.start()
+        indexes.start()
+        attendance_writer.start()
@@ -0,0 +1,306 @@
+import atexit
+import os
+import threading
+import time
+
+from bson import ObjectId, json_util
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from employees.models import EmployeeAttendance
+from employees.mongo import hr_db
+
+# Optional write-behind for punches: acknowledge after an fsync'ed append to a
+# local journal, insert into Mongo in batches from a background thread.
+WRITE_BEHIND = os.getenv("ATTENDANCE_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+# Must be a persistent, host-local directory shared by the workers of one host;
+# required with write-behind (a temp dir may be wiped on reboot, losing punches).
+JOURNAL_DIR = os.getenv("ATTENDANCE_JOURNAL_DIR")
+FLUSH_SIZE = int(os.getenv("ATTENDANCE_FLUSH_SIZE", "100"))
+FLUSH_SECONDS = float(os.getenv("ATTENDANCE_FLUSH_SECONDS", "1.0"))
+
+ATTENDANCE_TABLE = EmployeeAttendance._meta.db_table
+DUPLICATE_KEY = 11000
+
+if WRITE_BEHIND and not JOURNAL_DIR:
+    raise ImproperlyConfigured("ATTENDANCE_WRITE_BEHIND requires ATTENDANCE_JOURNAL_DIR to be set")
+
+_JOURNAL_PREFIX = "attendance-"
+_JOURNAL_SUFFIX = ".journal"
+
+
+def reserve_ids(count):
+    """
+    Reserve `count` attendence_id values from djongo's auto-increment counter
+    in one round trip. Returns the first reserved id.
+    """
+    counter = hr_db()["__schema__"].find_one_and_update(
+        {"name": ATTENDANCE_TABLE, "auto": {"$exists": True}},
+        {"$inc": {"auto.seq": count}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if counter is None:
+        raise RuntimeError(f"No djongo auto-increment counter for {ATTENDANCE_TABLE}")
+    return counter["auto"]["seq"] - count + 1
+
+
+def insert_documents(docs):
+    """
+    insert_many() attendance documents that carry a preassigned _id.
+    Replays are idempotent: documents already inserted fail with a duplicate
+    key error, which is ignored. Returns the number of new documents.
+    """
+    if not docs:
+        return 0
+    missing = [doc for doc in docs if doc.get("attendence_id") is None]
+    if missing:
+        first = reserve_ids(len(missing))
+        for offset, doc in enumerate(missing):
+            doc["attendence_id"] = first + offset
+    try:
+        return len(hr_db()[ATTENDANCE_TABLE].insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+def _owner(path):
+    """(pid, token) of the process incarnation that wrote a segment, or None."""
+    parts = os.path.basename(path)[len(_JOURNAL_PREFIX):-len(_JOURNAL_SUFFIX)].split("-")
+    try:
+        return int(parts[0]), parts[1]
+    except (ValueError, IndexError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_journal(path):
+    docs = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                docs.append(json_util.loads(line))
+            except ValueError:
+                break  # torn last line from a crash mid-append; it was never acknowledged
+    return docs
+
+
+def _close(file):
+    try:
+        file.close()
+    except OSError as e:
+        print(f"⚠️ Could not close attendance journal {file.name}: {e}")
+
+
+def _remove(path):
+    # A segment left behind after its documents were inserted is harmless:
+    # a later replay re-inserts the same _ids and they are skipped as duplicates.
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"⚠️ Could not remove flushed attendance journal {path}: {e}")
+
+
+class AttendanceWriter:
+    """
+    Write-behind buffer for EmployeeAttendance documents.
+
+    append() writes the document to this process's journal segment and fsyncs
+    before returning; a background thread flushes the buffered documents with
+    insert_many() every `flush_seconds` or `flush_size` documents, then
+    deletes the flushed segment. Segments left behind by dead processes are
+    claimed with an atomic rename and replayed.
+    """
+
+    def __init__(self, directory=JOURNAL_DIR, flush_size=FLUSH_SIZE, flush_seconds=FLUSH_SECONDS):
+        self.directory = directory
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._atexit_registered = False
+
+    def _reset(self):
+        # Called under _cond in a new process (first use or after fork)
+        self._pid = os.getpid()
+        # Distinguishes this process from an earlier one with the same pid (container restarts)
+        self._token = str(ObjectId())
+        self._seq = 0
+        self._file = None
+        self._path = None
+        self._buffer = []
+        self._sealed = []  # flushed-from segments whose documents are back in _buffer
+        self._claimed = []  # orphan segments we own but could not insert yet
+        os.makedirs(self.directory, exist_ok=True)
+        self._open_segment()
+        threading.Thread(target=self._run, name="attendance-write-behind", daemon=True).start()
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+
+    def _segment_path(self, tag):
+        return os.path.join(self.directory, f"{_JOURNAL_PREFIX}{self._pid}-{self._token}-{tag}{_JOURNAL_SUFFIX}")
+
+    def _open_segment(self):
+        # Only switch over once the new file is open, so a failed open leaves the current segment in use
+        path = self._segment_path(self._seq + 1)
+        file = open(path, "ab")
+        self._seq += 1
+        self._file, self._path = file, path
+
+    def start(self):
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset()
+
+    def append(self, doc):
+        line = json_util.dumps(doc).encode("utf-8") + b"\n"
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset()
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer.append(doc)
+            if len(self._buffer) >= self.flush_size:
+                self._cond.notify()
+
+    def _run(self):
+        try:
+            self.replay_orphans()
+        except OSError as e:
+            print(f"⚠️ Attendance journal replay failed: {e}")
+        while True:
+            try:
+                with self._cond:
+                    self._cond.wait_for(lambda: len(self._buffer) >= self.flush_size, timeout=self.flush_seconds)
+                self._flush()
+            except Exception as e:
+                # Keep the thread alive; the buffer and its segments are retried next round
+                print(f"⚠️ Attendance write-behind flush failed, will retry: {e}")
+                time.sleep(self.flush_seconds)
+
+    def flush(self):
+        """Insert everything buffered so far. Returns the number of new documents."""
+        try:
+            return self._flush()
+        except Exception as e:
+            print(f"⚠️ Attendance write-behind flush failed, will retry: {e}")
+            return 0
+
+    def _flush(self):
+        with self._flush_lock:
+            with self._cond:
+                if self._pid != os.getpid() or not self._buffer:
+                    return 0
+                old_file, old_path = self._file, self._path
+                self._open_segment()
+                docs, self._buffer = self._buffer, []
+                sealed, self._sealed = self._sealed + [old_path], []
+            _close(old_file)
+
+            try:
+                inserted = insert_documents(docs)
+            except Exception:
+                with self._cond:
+                    self._buffer = docs + self._buffer
+                    self._sealed = sealed + self._sealed
+                raise
+
+            for path in sealed:
+                _remove(path)
+            if self._claimed:
+                self._replay(list(self._claimed))
+            return inserted
+
+    def replay_orphans(self):
+        """Claim and insert journal segments of processes that are no longer running."""
+        with self._flush_lock:
+            claimed = list(self._claimed)
+            for name in sorted(os.listdir(self.directory)):
+                if not (name.startswith(_JOURNAL_PREFIX) and name.endswith(_JOURNAL_SUFFIX)):
+                    continue
+                path = os.path.join(self.directory, name)
+                owner = _owner(path)
+                if owner is None:
+                    continue
+                pid, token = owner
+                if pid == self._pid:
+                    if token == self._token:
+                        continue
+                elif _pid_alive(pid):
+                    continue
+                target = self._segment_path(f"replay{ObjectId()}")
+                try:
+                    os.rename(path, target)  # atomic: only one process wins the claim
+                except FileNotFoundError:
+                    continue
+                claimed.append(target)
+            return self._replay(claimed)
+
+    def _replay(self, paths):
+        replayed = 0
+        self._claimed = []
+        for path in paths:
+            try:
+                replayed += insert_documents(_read_journal(path))
+            except Exception as e:
+                print(f"⚠️ Attendance journal replay failed for {path}, will retry: {e}")
+                self._claimed.append(path)
+                continue
+            _remove(path)
+        return replayed
+
+    def _after_fork(self):
+        # Locks may have been held by another thread at fork time; the child
+        # starts its own segment and flush thread on first use.
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+
+
+writer = AttendanceWriter()
+os.register_at_fork(after_in_child=writer._after_fork)
+
+
+def start():
+    """Called from EmployeesConfig.ready(); replays orphaned journals in serving processes."""
+    from employees.warmup import is_serving_process
+
+    if WRITE_BEHIND and is_serving_process():
+        writer.start()
+
+
+def create_attendance(**fields):
+    """
+    Record a punch. Without write-behind this is EmployeeAttendance.objects.create();
+    with it, the returned instance is journaled and inserted asynchronously
+    (its attendence_id is assigned at flush time).
+    """
+    if not WRITE_BEHIND:
+        return EmployeeAttendance.objects.create(**fields)
+
+    att = EmployeeAttendance(attendence_time=timezone.now(), **fields)
+    doc = {"_id": ObjectId()}
+    for field in EmployeeAttendance._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        doc[field.column] = field.get_prep_value(getattr(att, field.attname))
+    writer.append(doc)
+    return att
@@ -1,5 +1,9 @@
 PAGE_MAPPING = {
     '/_b_a_c_k_e_n_d/HR/mark/':'FR-API-FR',
+    '/_b_a_c_k_e_n_d/HR/async/mark/':'FR-API-FR',
+    '/async/mark/':'FR-API-FR',
+    '/_b_a_c_k_e_n_d/HR/lookups/invalidate/':'FR-API-ADMIN',
+    '/lookups/invalidate/':'FR-API-ADMIN',
 }
 
 PAGE_ACTION_MAPPING = {
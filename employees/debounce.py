@@ -0,0 +1,99 @@
+import os
+import time
+
+from django.core.cache import caches
+
+from employees.caching import TTLCache
+
+# Repeat punches of the same employee and mode within this many seconds
+# return the first punch instead of recording a new one. 0 disables.
+DEBOUNCE_SECONDS = float(os.getenv("ATTENDANCE_DEBOUNCE_SECONDS", "60"))
+DEBOUNCE_MAX_ENTRIES = int(os.getenv("ATTENDANCE_DEBOUNCE_MAX_ENTRIES", "10000"))
+# Optional Django cache alias shared by all workers (e.g. file or memcached
+# backend); empty = per-process only.
+DEBOUNCE_CACHE_ALIAS = os.getenv("ATTENDANCE_DEBOUNCE_CACHE", "")
+# How long (seconds) a concurrent punch waits for the one being recorded.
+DEBOUNCE_WAIT_SECONDS = float(os.getenv("ATTENDANCE_DEBOUNCE_WAIT_SECONDS", "5"))
+
+# Placeholder stored while the first punch of a window is being inserted
+PENDING = "pending"
+# claim_punch() result when that insert did not finish within DEBOUNCE_WAIT_SECONDS
+IN_PROGRESS = object()
+_POLL_SECONDS = 0.05
+
+_recent = TTLCache(DEBOUNCE_SECONDS, DEBOUNCE_MAX_ENTRIES)
+
+
+def _shared_key(employee_id, mode):
+    return f"attendance:punch:{employee_id}:{mode}"
+
+
+def _lookup(employee_id, mode):
+    punch = _recent.get((employee_id, mode))
+    if punch is None and DEBOUNCE_CACHE_ALIAS:
+        shared = caches[DEBOUNCE_CACHE_ALIAS].get(_shared_key(employee_id, mode))
+        if shared is not None:
+            expires_at, punch = shared
+            if punch != PENDING:
+                # Keep the original window, not a fresh one
+                _recent.set((employee_id, mode), punch, ttl=expires_at - time.time())
+    return punch
+
+
+def _reserve(employee_id, mode):
+    """Atomically mark (employee_id, mode) as being recorded, in this process and in the shared cache."""
+    if not _recent.add((employee_id, mode), PENDING):
+        return False
+    if DEBOUNCE_CACHE_ALIAS and not caches[DEBOUNCE_CACHE_ALIAS].add(
+            _shared_key(employee_id, mode), (time.time() + DEBOUNCE_SECONDS, PENDING), DEBOUNCE_SECONDS):
+        _recent.delete((employee_id, mode))
+        return False
+    return True
+
+
+def recent_punch(employee_id, mode):
+    """The punch (response payload) recorded for (employee_id, mode) inside the window, or None."""
+    if DEBOUNCE_SECONDS <= 0:
+        return None
+    punch = _lookup(employee_id, mode)
+    return None if punch == PENDING else punch
+
+
+def claim_punch(employee_id, mode, wait=None):
+    """
+    Reserve (employee_id, mode) before inserting a punch. Returns None when the
+    caller should record it (then remember_punch() or release_punch()), the
+    punch already recorded inside the window, or IN_PROGRESS when a concurrent
+    insert is still running after `wait` seconds.
+    """
+    if DEBOUNCE_SECONDS <= 0:
+        return None
+    deadline = time.monotonic() + (DEBOUNCE_WAIT_SECONDS if wait is None else wait)
+    while True:
+        if _reserve(employee_id, mode):
+            return None
+        punch = _lookup(employee_id, mode)
+        if punch is not None and punch != PENDING:
+            return punch
+        if punch is None:
+            continue  # expired or released between the two calls; try to reserve again
+        if time.monotonic() >= deadline:
+            return IN_PROGRESS
+        time.sleep(_POLL_SECONDS)
+
+
+def release_punch(employee_id, mode):
+    """Drop a claim whose insert failed, so the next tap records for real."""
+    _recent.delete((employee_id, mode))
+    if DEBOUNCE_CACHE_ALIAS:
+        caches[DEBOUNCE_CACHE_ALIAS].delete(_shared_key(employee_id, mode))
+
+
+def remember_punch(employee_id, mode, punch):
+    if DEBOUNCE_SECONDS <= 0:
+        return
+    _recent.set((employee_id, mode), punch)
+    if DEBOUNCE_CACHE_ALIAS:
+        caches[DEBOUNCE_CACHE_ALIAS].set(
+            _shared_key(employee_id, mode), (time.time() + DEBOUNCE_SECONDS, punch), DEBOUNCE_SECONDS
+        )
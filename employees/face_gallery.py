@@ -0,0 +1,359 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from employees.face_index import ANN_ENABLED, ANN_MIN_SIZE, IVFIndex, owner_search
+from employees.fields import ENCODING_DIM, unpack_encoding
+from employees.models import Employee, EmployeeEncodingHistory
+
+# Same default as compare_encodings(); lower distance = better match.
+MATCH_THRESHOLD = float(os.getenv("FACE_MATCH_THRESHOLD", "0.5"))
+
+# How often (seconds) a worker checks whether another process changed the
+# Employee table behind its back. Local changes are applied immediately.
+REFRESH_SECONDS = float(os.getenv("FACE_GALLERY_REFRESH_SECONDS", "60"))
+
+# Templates matched per employee: the current encoding plus up to K-1 of the
+# most recent EmployeeEncodingHistory entries. 1 = current encoding only.
+TEMPLATES_PER_EMPLOYEE = max(1, int(os.getenv("FACE_GALLERY_TEMPLATES", "3")))
+
+# When a site-restricted match fails, retry against the whole gallery.
+SITE_FALLBACK_GLOBAL = os.getenv("FACE_SITE_FALLBACK_GLOBAL", "true").lower() in ("1", "true", "yes")
+
+GalleryMatch = namedtuple("GalleryMatch", ["employee_id", "name", "distance", "is_match"])
+
+NO_MATCH = GalleryMatch(None, None, float("inf"), False)
+
+
+def _to_vector(encoding):
+    """Convert a stored encoding (any format, see employees.fields) to a float32 vector, or None."""
+    vec = unpack_encoding(encoding)
+    if vec is None or vec.shape[0] != ENCODING_DIM:
+        return None
+    return vec
+
+
+class FaceGallery:
+    """
+    Process-level store of all active face encodings.
+
+    Templates live in one contiguous float32 N x 128 matrix with their squared
+    norms and an owner-index array, so a probe is matched with one
+    matrix-vector product and a per-owner minimum instead of a Python loop
+    over Employee rows. Each employee (owner) has up to `templates` rows: the
+    current encoding first, then the most recent history entries.
+    The matrix is loaded lazily on first use and kept in sync incrementally via
+    upsert() / remove().
+
+    With `ann_enabled`, galleries of at least `ann_min_size` rows are searched
+    through an IVFIndex instead of brute force.
+
+    Owners carry a site; match(sites=[...]) scans only the rows of those
+    sites plus employees without a site. Rows are grouped per site lazily
+    (argsort of the row sites, like IVFIndex lists).
+    """
+
+    def __init__(self, threshold=MATCH_THRESHOLD, refresh_seconds=REFRESH_SECONDS,
+                 ann_enabled=ANN_ENABLED, ann_min_size=ANN_MIN_SIZE, templates=TEMPLATES_PER_EMPLOYEE):
+        self.threshold = threshold
+        self.refresh_seconds = refresh_seconds
+        self.ann_enabled = ann_enabled
+        self.ann_min_size = ann_min_size
+        self.templates = templates
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._loaded = False
+        # Template rows
+        self._size = 0
+        self._matrix = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        self._owner = np.empty(0, dtype=np.int64)
+        # Owners (employees)
+        self._n_owners = 0
+        self._ids = np.empty(0, dtype=object)
+        self._names = np.empty(0, dtype=object)
+        self._owner_site = np.empty(0, dtype=np.int64)
+        self._slot_of = {}
+        self._rows_of = []
+        # Site partitions; code 0 = employees without a site
+        self._site_codes = {"": 0}
+        self._partitions = None
+        self._index = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def __len__(self):
+        """Number of employees in the gallery."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._n_owners
+
+    # ---- Loading ----
+
+    def _db_version(self):
+        """Cheap probe used to detect changes made by other processes."""
+        latest = (
+            Employee.objects.order_by("-lastmodified_date")
+            .values_list("lastmodified_date", flat=True)
+            .first()
+        )
+        return (Employee.objects.count(), latest)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._rebuild()
+            return
+        if self.refresh_seconds and time.monotonic() - self._checked_at > self.refresh_seconds:
+            self._checked_at = time.monotonic()
+            if self._db_version() != self._version:
+                self._rebuild()
+
+    def _history(self, employee_ids=None):
+        """{employee_id: [encoding, ...]} newest first, at most templates-1 each."""
+        if self.templates <= 1:
+            return {}
+        rows = EmployeeEncodingHistory.objects.order_by("employee_id", "-created_date", "-id")
+        if employee_ids is not None:
+            rows = rows.filter(employee_id__in=list(employee_ids))
+
+        history = {}
+        for employee_id, encoding in rows.values_list("employee_id", "encoding"):
+            kept = history.setdefault(employee_id, [])
+            if len(kept) < self.templates - 1:
+                kept.append(encoding)
+        return history
+
+    def _rebuild(self):
+        version = self._db_version()
+        rows = (
+            Employee.objects.filter(is_active=True)
+            .exclude(current_face_encoding__isnull=True)
+            .values_list("employee_id", "name", "site", "current_face_encoding")
+        )
+        history = self._history()
+
+        ids, names, sites, owners, vectors, rows_of = [], [], [], [], [], []
+        for employee_id, name, site, encoding in rows:
+            current = _to_vector(encoding)
+            if current is None:
+                continue  # skip invalid encodings
+            templates = [current] + [_to_vector(e) for e in history.get(employee_id, ())]
+            templates = [vec for vec in templates if vec is not None]
+            slot = len(ids)
+            ids.append(employee_id)
+            names.append(name)
+            sites.append(site)
+            rows_of.append(list(range(len(vectors), len(vectors) + len(templates))))
+            owners.extend([slot] * len(templates))
+            vectors.extend(templates)
+
+        self._clear()
+        if vectors:
+            self._matrix = np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+        self._size = len(vectors)
+        self._sq_norms = np.einsum("ij,ij->i", self._matrix, self._matrix)
+        self._owner = np.array(owners, dtype=np.int64)
+        self._n_owners = len(ids)
+        self._ids = np.array(ids, dtype=object)
+        self._names = np.array(names, dtype=object)
+        self._owner_site = np.array([self._site_code(site) for site in sites], dtype=np.int64)
+        self._slot_of = {employee_id: i for i, employee_id in enumerate(ids)}
+        self._rows_of = rows_of
+        self._version = version
+        self._checked_at = time.monotonic()
+        self._loaded = True
+
+    def invalidate(self):
+        """Drop the in-memory matrix; it is rebuilt from the database on next use."""
+        with self._lock:
+            self._clear()
+
+    # ---- Incremental updates ----
+
+    def _grow_rows(self):
+        capacity = max(16, 2 * self._matrix.shape[0])
+        matrix = np.empty((capacity, ENCODING_DIM), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        owner = np.empty(capacity, dtype=np.int64)
+        owner[:self._size] = self._owner[:self._size]
+        self._matrix, self._sq_norms, self._owner = matrix, sq_norms, owner
+
+    def _grow_owners(self):
+        capacity = max(16, 2 * self._ids.shape[0])
+        ids = np.empty(capacity, dtype=object)
+        ids[:self._n_owners] = self._ids[:self._n_owners]
+        names = np.empty(capacity, dtype=object)
+        names[:self._n_owners] = self._names[:self._n_owners]
+        owner_site = np.empty(capacity, dtype=np.int64)
+        owner_site[:self._n_owners] = self._owner_site[:self._n_owners]
+        self._ids, self._names, self._owner_site = ids, names, owner_site
+
+    def _site_code(self, site):
+        return self._site_codes.setdefault(site or "", len(self._site_codes))
+
+    def upsert(self, employee_id, name, encoding, is_active=True, site=None):
+        """
+        Add or replace one employee's templates (current encoding plus recent
+        history). Inactive or empty encodings are removed.
+        """
+        vec = _to_vector(encoding) if is_active else None
+        if not self._loaded:
+            return  # picked up by the lazy rebuild
+        templates = []
+        if vec is not None:
+            history = self._history([employee_id]).get(employee_id, ())
+            templates = [vec] + [v for v in map(_to_vector, history) if v is not None]
+
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(employee_id)
+            if not templates:
+                return
+
+            if self._n_owners == self._ids.shape[0]:
+                self._grow_owners()
+            slot = self._n_owners
+            self._n_owners += 1
+            self._ids[slot] = employee_id
+            self._names[slot] = name
+            self._owner_site[slot] = self._site_code(site)
+            self._slot_of[employee_id] = slot
+            self._rows_of.append([])
+
+            for template in templates:
+                if self._size == self._matrix.shape[0]:
+                    self._grow_rows()
+                row = self._size
+                self._size += 1
+                self._matrix[row] = template
+                self._sq_norms[row] = float(template @ template)
+                self._owner[row] = slot
+                self._rows_of[slot].append(row)
+                self._partitions = None
+                if self._index is not None:
+                    self._index.set_row(row, template)
+
+    def remove(self, employee_id):
+        with self._lock:
+            if self._loaded:
+                self._remove(employee_id)
+
+    def _remove_row(self, row):
+        self._partitions = None
+        last = self._size - 1
+        if row != last:
+            # Move the last row into the hole to keep the matrix dense
+            self._matrix[row] = self._matrix[last]
+            self._sq_norms[row] = self._sq_norms[last]
+            owner = self._owner[last]
+            self._owner[row] = owner
+            rows = self._rows_of[owner]
+            rows[rows.index(last)] = row
+            if self._index is not None:
+                self._index.move_row(last, row)
+        self._size = last
+        if self._index is not None:
+            self._index.truncate(last)
+
+    def _remove(self, employee_id):
+        slot = self._slot_of.pop(employee_id, None)
+        if slot is None:
+            return
+        # Highest rows first, so a row of this owner is never moved into a hole
+        for row in sorted(self._rows_of[slot], reverse=True):
+            self._remove_row(row)
+
+        last = self._n_owners - 1
+        if slot != last:
+            # Same compaction for the owner arrays
+            self._ids[slot] = self._ids[last]
+            self._names[slot] = self._names[last]
+            self._owner_site[slot] = self._owner_site[last]
+            self._slot_of[self._ids[slot]] = slot
+            self._rows_of[slot] = self._rows_of[last]
+            self._owner[self._rows_of[slot]] = slot
+        self._rows_of.pop()
+        self._ids[last] = None
+        self._names[last] = None
+        self._n_owners = last
+
+    # ---- Matching ----
+
+    def _search(self, probe):
+        n = self._size
+        owners = self._owner[:n]
+        if not self.ann_enabled or n < self.ann_min_size:
+            return owner_search(probe, self._matrix[:n], self._sq_norms[:n], owners, self._n_owners)
+
+        # (Re)train when the gallery has doubled since the quantizer was fitted
+        if self._index is None or n > 2 * self._index.trained_size:
+            self._index = IVFIndex()
+            self._index.build(self._matrix[:n])
+        candidates = self._index.candidates(probe)
+        if candidates.size == 0:
+            candidates = None
+        return owner_search(probe, self._matrix[:n], self._sq_norms[:n], owners, self._n_owners, candidates)
+
+    def _partition_rows(self, sites):
+        """Rows of employees at any of `sites`, plus employees without a site."""
+        if self._partitions is None:
+            row_sites = self._owner_site[self._owner[:self._size]]
+            order = np.argsort(row_sites, kind="stable")
+            offsets = np.searchsorted(row_sites[order], np.arange(len(self._site_codes) + 1))
+            self._partitions = (order, offsets)
+        order, offsets = self._partitions
+
+        codes = {0} | {self._site_codes[site] for site in sites if site in self._site_codes}
+        return np.concatenate([order[offsets[c]:offsets[c + 1]] for c in sorted(codes)])
+
+    def _result(self, best, probe):
+        if best < 0:
+            return NO_MATCH
+        # Recompute the winner's templates in float64 so the threshold check is exact
+        diff = self._matrix[self._rows_of[best]].astype(np.float64) - probe.astype(np.float64)
+        distance = float(np.sqrt(np.min(np.einsum("ij,ij->i", diff, diff))))
+        return GalleryMatch(
+            self._ids[best], self._names[best], distance, distance <= self.threshold
+        )
+
+    def match(self, encoding, sites=None, fallback=SITE_FALLBACK_GLOBAL):
+        """
+        Return the closest active employee as a GalleryMatch, using the
+        employee's nearest template.
+        is_match is True when the distance is within the threshold.
+
+        With `sites`, only those partitions are searched (exactly); when that
+        finds no match and `fallback` is set, the whole gallery is searched.
+        """
+        probe = _to_vector(encoding)
+        if probe is None:
+            return NO_MATCH
+
+        with self._lock:
+            self._ensure_loaded()
+            if self._size == 0:
+                return NO_MATCH
+
+            if sites:
+                n = self._size
+                best, _ = owner_search(
+                    probe, self._matrix[:n], self._sq_norms[:n], self._owner[:n], self._n_owners,
+                    self._partition_rows(sites),
+                )
+                result = self._result(best, probe)
+                if result.is_match or not fallback:
+                    return result
+
+            # ||a - b||^2 = ||a||^2 - 2 a.b + ||b||^2, for all (or probed) rows at once
+            best, _ = self._search(probe)
+            return self._result(best, probe)
+
+gallery = FaceGallery()
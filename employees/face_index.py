@@ -0,0 +1,168 @@
+import os
+
+import numpy as np
+
+# ANN search is optional; below ANN_MIN_SIZE rows exact search is used anyway.
+ANN_ENABLED = os.getenv("FACE_ANN_ENABLED", "false").lower() in ("1", "true", "yes")
+ANN_MIN_SIZE = int(os.getenv("FACE_ANN_MIN_SIZE", "5000"))
+ANN_NLIST = int(os.getenv("FACE_ANN_NLIST", "0"))  # 0 = derive from gallery size
+ANN_NPROBE = int(os.getenv("FACE_ANN_NPROBE", "16"))
+
+_BATCH = 4096
+
+
+def exact_search(probe, matrix, sq_norms):
+    """
+    Brute-force nearest row of `matrix` for `probe`.
+    Returns (row, squared_distance) or (-1, inf) for an empty matrix.
+    """
+    if matrix.shape[0] == 0:
+        return -1, float("inf")
+    sq_dist = sq_norms - 2.0 * (matrix @ probe)
+    row = int(np.argmin(sq_dist))
+    return row, float(sq_dist[row] + probe @ probe)
+
+
+def owner_search(probe, matrix, sq_norms, owners, n_owners, rows=None):
+    """
+    Nearest owner when each owner has several rows (templates) in `matrix`.
+    `owners[i]` is the owner index of row i; `rows` optionally restricts the
+    scan to candidate rows (e.g. from IVFIndex.candidates()). The per-owner
+    minimum is taken in one vectorized np.minimum.at pass.
+    Returns (owner, squared_distance) or (-1, inf) when nothing is scanned.
+    """
+    if rows is not None:
+        matrix, sq_norms, owners = matrix[rows], sq_norms[rows], owners[rows]
+    if matrix.shape[0] == 0 or n_owners == 0:
+        return -1, float("inf")
+    sq_dist = sq_norms - 2.0 * (matrix @ probe)
+    per_owner = np.full(n_owners, np.inf, dtype=sq_dist.dtype)
+    np.minimum.at(per_owner, owners, sq_dist)
+    owner = int(np.argmin(per_owner))
+    return owner, float(per_owner[owner] + probe @ probe)
+
+
+def _nearest_centroid(vectors, centroids, c_sq_norms):
+    """Index of the closest centroid for every row, computed in batches to bound memory."""
+    out = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], _BATCH):
+        block = vectors[start:start + _BATCH]
+        out[start:start + _BATCH] = np.argmin(c_sq_norms - 2.0 * (block @ centroids.T), axis=1)
+    return out
+
+
+class IVFIndex:
+    """
+    Inverted-file index over the rows of an external float32 matrix.
+
+    A k-means coarse quantizer splits the rows into `nlist` lists; a probe only
+    scans the rows of its `nprobe` closest lists. The index stores row numbers,
+    not vectors, so the owner (FaceGallery) keeps a single copy of the data and
+    reports row moves through set_row() / move_row() / truncate().
+    """
+
+    def __init__(self, nlist=ANN_NLIST, nprobe=ANN_NPROBE, train_iters=10, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iters = train_iters
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+        self._c_sq_norms = None
+        self._assign = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._order = None
+        self._offsets = None
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, matrix):
+        """Fit the coarse quantizer with a few Lloyd iterations on a sample of rows."""
+        n = matrix.shape[0]
+        nlist = self.nlist or max(1, int(2 * np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(self.seed)
+
+        sample_size = min(n, nlist * 64)
+        sample = matrix[rng.choice(n, sample_size, replace=False)] if sample_size < n else matrix
+        centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+
+        for _ in range(self.train_iters):
+            c_sq = np.einsum("ij,ij->i", centroids, centroids)
+            labels = _nearest_centroid(sample, centroids, c_sq)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty lists with random sample rows
+            empty = np.flatnonzero(~filled)
+            if empty.size:
+                centroids[empty] = sample[rng.choice(sample.shape[0], empty.size)]
+
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self._c_sq_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        self.trained_size = n
+
+    def build(self, matrix):
+        """Train on `matrix` and assign all of its rows."""
+        self.train(matrix)
+        self._assign = _nearest_centroid(matrix, self.centroids, self._c_sq_norms)
+        self._size = matrix.shape[0]
+        self._order = None
+
+    # ---- Row bookkeeping, mirrored from the owning matrix ----
+
+    def set_row(self, row, vec):
+        if row >= self._assign.shape[0]:
+            assign = np.empty(max(16, 2 * self._assign.shape[0], row + 1), dtype=np.int32)
+            assign[:self._size] = self._assign[:self._size]
+            self._assign = assign
+        self._assign[row] = int(np.argmin(self._c_sq_norms - 2.0 * (self.centroids @ vec)))
+        self._size = max(self._size, row + 1)
+        self._order = None
+
+    def move_row(self, src, dst):
+        self._assign[dst] = self._assign[src]
+        self._order = None
+
+    def truncate(self, size):
+        self._size = size
+        self._order = None
+
+    def _lists(self):
+        if self._order is None:
+            assign = self._assign[:self._size]
+            self._order = np.argsort(assign, kind="stable").astype(np.int64)
+            self._offsets = np.searchsorted(assign[self._order], np.arange(len(self.centroids) + 1))
+        return self._order, self._offsets
+
+    # ---- Search ----
+
+    def candidates(self, probe):
+        """Row numbers in the `nprobe` lists closest to `probe`."""
+        order, offsets = self._lists()
+        nlist = len(self.centroids)
+
+        c_dist = self._c_sq_norms - 2.0 * (self.centroids @ probe)
+        if self.nprobe < nlist:
+            probed = np.argpartition(c_dist, self.nprobe - 1)[:self.nprobe]
+        else:
+            probed = np.arange(nlist)
+        return np.concatenate([order[offsets[l]:offsets[l + 1]] for l in probed])
+
+    def search(self, probe, matrix, sq_norms):
+        """
+        Approximate nearest row of `matrix` for `probe`.
+        Returns (row, squared_distance); same contract as exact_search().
+        """
+        n = self._size
+        candidates = self.candidates(probe)
+        if candidates.size == 0:
+            return exact_search(probe, matrix[:n], sq_norms[:n])
+
+        sq_dist = sq_norms[candidates] - 2.0 * (matrix[candidates] @ probe)
+        best = int(np.argmin(sq_dist))
+        return int(candidates[best]), float(sq_dist[best] + probe @ probe)
@@ -2,30 +2,95 @@ import face_recognition
 import numpy as np
 from io import BytesIO
 from PIL import Image
-import base64
+import binascii
 import numpy as np
 import face_recognition
 from io import BytesIO
 import cv2
 from deepface import DeepFace
+from deepface.modules import modeling
 import os
+import time
+from contextlib import contextmanager
 
 os.environ['DEEPFACE_LOG_LEVEL'] = 'error'
 
+# Detector used for the single detection pass: 'hog' (CPU) or 'cnn' (dlib CNN, needs GPU to be fast)
+FACE_DETECTOR_MODEL = os.getenv("FACE_DETECTOR_MODEL", "hog")
+
+# Longest image side used for detection/encoding; larger uploads are decoded at
+# reduced resolution. 1024px keeps a kiosk face well above the ~150px where
+# dlib encodings start to drift (check with `manage.py bench_face_pipeline`).
+# 0 decodes at native resolution.
+FACE_DECODE_MAX_DIM = int(os.getenv("FACE_DECODE_MAX_DIM", "1024"))
+
 class SpoofingDetectedError(Exception):
     pass
 
-def check_liveness(img_rgb):
+
+@contextmanager
+def _timed(timings, stage):
+    """Add the elapsed seconds of the block to timings[stage] when timings is a dict."""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def decode_image(source, max_dim=FACE_DECODE_MAX_DIM):
+    """
+    Decode bytes, a memoryview or a file object into an RGB uint8 array whose
+    longest side is at most max_dim.
+    JPEGs are decoded at 1/2, 1/4 or 1/8 scale by libjpeg (PIL draft mode), so
+    the full-resolution bitmap is never materialised.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)  # shares the buffer of a bytes object, no copy
+    elif hasattr(source, "seek"):
+        source.seek(0)
+
+    img = Image.open(source)
+    if max_dim and max(img.size) > max_dim:
+        img.draft("RGB", (max_dim, max_dim))
+    img = img.convert("RGB")
+    if max_dim and max(img.size) > max_dim:
+        img.thumbnail((max_dim, max_dim), Image.BILINEAR)
+    return np.array(img)
+
+
+def detect_faces(img_rgb):
+    """Face boxes as (top, right, bottom, left) tuples, the format face_recognition uses."""
+    return face_recognition.face_locations(img_rgb, model=FACE_DETECTOR_MODEL)
+
+
+def check_liveness(img_rgb, face_locations=None):
     """
     Checks if the face is real using DeepFace's Anti-Spoofing (MiniFASNet).
     Returns True if real, False if spoof.
+    If face_locations is given, those boxes are scored directly; otherwise
+    DeepFace runs its own opencv detector first.
     If no face is detected by DeepFace, currently returns True (fail-open) 
     or you can change to False (fail-closed).
     """
     try:
         # Convert RGB to BGR for DeepFace/OpenCV
         img_bgr = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
-        
+
+        if face_locations is not None:
+            # Score the caller's boxes; no second detection pass
+            spoof_model = modeling.build_model(task="spoofing", model_name="Fasnet")
+            for top, right, bottom, left in face_locations:
+                is_real, _ = spoof_model.analyze(
+                    img=img_bgr, facial_area=(left, top, right - left, bottom - top)
+                )
+                if not is_real:
+                    return False
+            return True
+
         # Run Anti-Spoofing
         # enforce_detection=False allows silent return if no face (though we handle it)
         faces = DeepFace.extract_faces(
@@ -58,25 +123,47 @@ def check_liveness(img_rgb):
         return False
 
 
-def imagefile_to_encoding(file_obj) -> list:
+def warm_up_models():
     """
-    Accepts an image file object (InMemoryUploadedFile or bytes) and returns an encoding (list)
+    Force-load the anti-spoofing and dlib models by running them once on a blank image,
+    using the whole frame as the face box. Calls the models directly (not through
+    check_liveness, which fails open) so a broken model fails the warm-up.
+    """
+    dummy = np.zeros((160, 160, 3), dtype=np.uint8)
+    box = [(0, 160, 160, 0)]
+    spoof_model = modeling.build_model(task="spoofing", model_name="Fasnet")
+    spoof_model.analyze(img=cv2.cvtColor(dummy, cv2.COLOR_RGB2BGR), facial_area=(0, 0, 160, 160))
+    detect_faces(dummy)
+    face_recognition.face_encodings(dummy, known_face_locations=box)
+
+
+def imagefile_to_encoding(file_obj, timings=None, max_dim=FACE_DECODE_MAX_DIM) -> list:
+    """
+    Accepts an image file object (InMemoryUploadedFile, bytes or memoryview) and returns an encoding (list)
     Returns [] if no face is found.
+    Faces are detected once; the same boxes feed the anti-spoofing model and the encoder.
+    Pass a dict as `timings` to collect seconds spent per stage.
     """
     try:
-        if isinstance(file_obj, (bytes, bytearray)):
-            img = face_recognition.load_image_file(BytesIO(file_obj))
-        else:
-            img = face_recognition.load_image_file(file_obj)
+        with _timed(timings, "decode"):
+            img = decode_image(file_obj, max_dim=max_dim)
+
+        with _timed(timings, "detect"):
+            face_locations = detect_faces(img)
+        if not face_locations:
+            return []  # return empty list instead of None
 
         # ✅ Anti-Spoofing Check
-        if not check_liveness(img):
+        with _timed(timings, "liveness"):
+            is_real = check_liveness(img, face_locations=face_locations)
+        if not is_real:
             print("⚠️ Spoofing attempt detected!")
             raise SpoofingDetectedError("Spoofing attempt detected")
 
-        encodings = face_recognition.face_encodings(img)
+        with _timed(timings, "encode"):
+            encodings = face_recognition.face_encodings(img, known_face_locations=face_locations[:1])
         if not encodings:
-            return []  # return empty list instead of None
+            return []
         return encodings[0].tolist()
 
     except Exception as e:
@@ -84,10 +171,14 @@ def imagefile_to_encoding(file_obj) -> list:
         return []
 
 
+def base64_to_bytes(b64_string) -> bytes:
+    # Skip an optional data-URL header without copying the payload
+    start = b64_string.find(',') + 1
+    return binascii.a2b_base64(memoryview(b64_string.encode('ascii'))[start:])
+
+
 def base64_to_encoding(b64_string) -> list:
-    header, data = (b64_string.split(',',1) if ',' in b64_string else (None, b64_string))
-    imgbytes = base64.b64decode(data)
-    return imagefile_to_encoding(imgbytes)
+    return imagefile_to_encoding(base64_to_bytes(b64_string))
 
 def compare_encodings(known_encoding, unknown_encoding):
     """
@@ -0,0 +1,108 @@
+import ast
+import json
+import numbers
+
+import numpy as np
+from bson import Binary
+from django.db import models
+
+ENCODING_DIM = 128
+ENCODING_DTYPE = np.dtype("<f4")
+
+
+def _parse_legacy(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return ast.literal_eval(value)
+
+
+def _decode_one(value):
+    """One encoding in any stored format as a flat float32 array."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return np.frombuffer(value, dtype=ENCODING_DTYPE)
+    if isinstance(value, str):
+        value = _parse_legacy(value)
+    return np.asarray(value, dtype=ENCODING_DTYPE).reshape(-1)
+
+
+def unpack_encoding(value, multiple=False):
+    """
+    Decode a stored face encoding into a float32 ndarray.
+    Accepts the compact format (float32 bytes / BSON Binary, zero-copy via
+    np.frombuffer) and the legacy formats (list of floats, JSON or repr string).
+    A legacy list of encodings may mix those formats per element; malformed
+    elements are logged and skipped.
+    Returns a (128,) array, or (N, 128) when `multiple`; None for empty values.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = _parse_legacy(value)
+    if isinstance(value, (list, tuple)) and value and not isinstance(value[0], numbers.Real):
+        rows = []
+        for item in value:
+            try:
+                row = _decode_one(item)
+            except (ValueError, TypeError, SyntaxError) as e:
+                print(f"⚠️ Skipping malformed face encoding: {e}")
+                continue
+            if row.size == 0 or row.size % ENCODING_DIM:
+                print(f"⚠️ Skipping face encoding with {row.size} values")
+                continue
+            rows.append(row)
+        arr = np.concatenate(rows) if rows else np.empty(0, dtype=ENCODING_DTYPE)
+    else:
+        arr = _decode_one(value)
+    if arr.size == 0:
+        return None
+    return arr.reshape(-1, ENCODING_DIM) if multiple else arr.reshape(-1)
+
+
+def pack_encoding(value):
+    """float32 little-endian bytes of one encoding or a stack of them, as BSON Binary (512 bytes each)."""
+    if value is None:
+        return None
+    arr = unpack_encoding(value, multiple=True)
+    if arr is None:
+        return None
+    return Binary(np.ascontiguousarray(arr, dtype=ENCODING_DTYPE).tobytes())
+
+
+class FaceEncodingField(models.Field):
+    """
+    Face encoding stored as packed float32 in a BSON Binary instead of a JSON
+    list of doubles (512 bytes vs ~2.5 KB per encoding).
+    Python value is a float32 ndarray: shape (128,), or (N, 128) with multiple=True.
+    Legacy list rows are read transparently.
+    """
+    description = "Face encoding (packed float32)"
+
+    def __init__(self, *args, multiple=False, **kwargs):
+        self.multiple = multiple
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.multiple:
+            kwargs["multiple"] = True
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return "BinaryField"
+
+    def from_db_value(self, value, expression, connection):
+        return unpack_encoding(value, self.multiple)
+
+    def to_python(self, value):
+        return unpack_encoding(value, self.multiple)
+
+    def get_prep_value(self, value):
+        return pack_encoding(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        return value if prepared else self.get_prep_value(value)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return json.dumps(None if value is None else np.asarray(value).tolist())
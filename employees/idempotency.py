@@ -0,0 +1,107 @@
+import io
+import os
+import time
+
+from django.core.cache import caches
+
+from employees.caching import TTLCache
+from employees.face_utils import compute_md5
+
+# How long (seconds) a /mark/ result is replayed for a retried request. 0 disables.
+IDEMPOTENCY_TTL = float(os.getenv("MARK_IDEMPOTENCY_TTL", "30"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("MARK_IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# Optional Django cache alias shared by all workers; empty = per-process only.
+IDEMPOTENCY_CACHE_ALIAS = os.getenv("MARK_IDEMPOTENCY_CACHE", "")
+
+# How long (seconds) a retry waits for a concurrent request with the same key
+# before it is answered 409.
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("MARK_IDEMPOTENCY_WAIT_SECONDS", "5"))
+
+# Final answers worth replaying; 5xx / 503 (busy) must be retried for real.
+CACHEABLE_STATUSES = (200, 201, 400, 404)
+
+# Placeholder stored while the request owning a key is still running
+PENDING = "pending"
+# claim() result when the owner did not finish within IDEMPOTENCY_WAIT_SECONDS
+IN_PROGRESS = object()
+_POLL_SECONDS = 0.05
+
+_results = TTLCache(IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_ENTRIES)
+
+
+def request_key(explicit_key, image, device_id, mode):
+    """
+    Key of a mark request: the client's Idempotency-Key when given, otherwise
+    the MD5 of the image, scoped to the device and mode.
+    """
+    if explicit_key:
+        ident = f"key:{explicit_key}"
+    else:
+        ident = f"md5:{compute_md5(image if hasattr(image, 'read') else io.BytesIO(image))}"
+    return f"mark:{device_id}:{mode}:{ident}"
+
+
+def _lookup(key):
+    result = _results.get(key)
+    if result is None and IDEMPOTENCY_CACHE_ALIAS:
+        result = caches[IDEMPOTENCY_CACHE_ALIAS].get(key)
+    return result
+
+
+def _reserve(key):
+    """Atomically mark `key` as in progress, in this process and in the shared cache."""
+    if not _results.add(key, PENDING):
+        return False
+    if IDEMPOTENCY_CACHE_ALIAS and not caches[IDEMPOTENCY_CACHE_ALIAS].add(key, PENDING, IDEMPOTENCY_TTL):
+        _results.delete(key)
+        return False
+    return True
+
+
+def cached_result(key):
+    """(status, body) of an earlier, finished request with this key, or None."""
+    if IDEMPOTENCY_TTL <= 0:
+        return None
+    result = _lookup(key)
+    return None if result == PENDING else result
+
+
+def claim(key, wait=None):
+    """
+    Reserve `key` before running a mark request. Returns None when the caller
+    owns the key (it must then call remember_result() or release()), the
+    (status, body) of an earlier request with the key, or IN_PROGRESS when a
+    concurrent request with the key is still running after `wait` seconds.
+    """
+    if IDEMPOTENCY_TTL <= 0:
+        return None
+    deadline = time.monotonic() + (IDEMPOTENCY_WAIT_SECONDS if wait is None else wait)
+    while True:
+        if _reserve(key):
+            return None
+        result = _lookup(key)
+        if result is not None and result != PENDING:
+            return result
+        if result is None:
+            continue  # expired or released between the two calls; try to reserve again
+        if time.monotonic() >= deadline:
+            return IN_PROGRESS
+        time.sleep(_POLL_SECONDS)
+
+
+def release(key):
+    """Give up a claimed key without a result, so a retry runs for real."""
+    _results.delete(key)
+    if IDEMPOTENCY_CACHE_ALIAS:
+        caches[IDEMPOTENCY_CACHE_ALIAS].delete(key)
+
+
+def remember_result(key, status, body):
+    if IDEMPOTENCY_TTL <= 0:
+        return
+    if status not in CACHEABLE_STATUSES:
+        release(key)
+        return
+    _results.set(key, (status, body))
+    if IDEMPOTENCY_CACHE_ALIAS:
+        caches[IDEMPOTENCY_CACHE_ALIAS].set(key, (status, body), IDEMPOTENCY_TTL)
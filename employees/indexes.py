@@ -0,0 +1,139 @@
+import os
+import threading
+from collections import namedtuple
+
+from employees.lookups import LOOKUP_COLLECTIONS, LOOKUP_MODIFIED_FIELD
+from employees.models import DeviceSite, Employee, EmployeeAttendance, EmployeeEncodingHistory
+from employees.mongo import PROFILE_COLLECTION, global_db, hr_db
+from employees.thumbnails import DERIVATIVE_BUCKET
+
+# What to do at process start: "check" reports missing indexes, "create" builds
+# them, "off" skips the check.
+INDEX_CHECK_ON_START = os.getenv("MONGO_INDEX_CHECK_ON_START", "check").lower()
+
+IndexSpec = namedtuple("IndexSpec", ["database", "collection", "keys", "name"])
+
+ATTENDANCE = EmployeeAttendance._meta.db_table
+EMPLOYEE = Employee._meta.db_table
+ENCODING_HISTORY = EmployeeEncodingHistory._meta.db_table
+DEVICE_SITE = DeviceSite._meta.db_table
+
+# djongo runs with ENFORCE_SCHEMA False and never creates these itself.
+REQUIRED_INDEXES = [
+    # attendance report: time range, newest first, keyset on (time, id)
+    IndexSpec("hr", ATTENDANCE, [("attendence_time", -1), ("attendence_id", -1)], "attendance_time_id"),
+    # per-employee attendance history
+    IndexSpec("hr", ATTENDANCE, [("employee_id", 1), ("attendence_time", -1)], "attendance_employee_time"),
+    # get_employee_by_md5
+    IndexSpec("hr", EMPLOYEE, [("image_md5", 1)], "employee_image_md5"),
+    # face gallery staleness probe
+    IndexSpec("hr", EMPLOYEE, [("lastmodified_date", -1)], "employee_lastmodified"),
+    # encoding history retention / newest templates per employee
+    IndexSpec("hr", ENCODING_HISTORY, [("employee_id", 1), ("created_date", -1)], "encoding_history_employee_created"),
+    # device -> sites map
+    IndexSpec("hr", DEVICE_SITE, [("device_id", 1)], "device_site_device"),
+    # GridFS lookups by image hash / owner
+    IndexSpec("hr", "fs.files", [("md5", 1)], "fs_files_md5"),
+    IndexSpec("hr", "fs.files", [("employeeId", 1)], "fs_files_employeeId"),
+    IndexSpec("global", "fs.files", [("md5", 1)], "fs_files_md5"),
+    IndexSpec("global", "fs.files", [("employeeId", 1)], "fs_files_employeeId"),
+    # encode_employee_face and the report's profile join
+    IndexSpec("global", PROFILE_COLLECTION, [("employeeId", 1)], "profile_employeeId"),
+    # lookup cache staleness probes: newest modified timestamp per collection
+    *[IndexSpec("global", collection, [(LOOKUP_MODIFIED_FIELD, -1)], "lookup_modified")
+      for collection in LOOKUP_COLLECTIONS],
+    # thumbnail derivatives
+    IndexSpec("hr", f"{DERIVATIVE_BUCKET}.files", [("image_md5", 1), ("size", 1), ("format", 1)],
+              "derivative_md5_size_format"),
+]
+
+
+def _db(name):
+    return hr_db() if name == "hr" else global_db()
+
+
+def _has_index(spec):
+    existing = _db(spec.database)[spec.collection].index_information()
+    return any([tuple(k) for k in info["key"]] == [tuple(k) for k in spec.keys] for info in existing.values())
+
+
+def missing_indexes():
+    return [spec for spec in REQUIRED_INDEXES if not _has_index(spec)]
+
+
+def ensure_indexes():
+    """Create every missing required index. Returns the specs that were created."""
+    created = []
+    for spec in missing_indexes():
+        _db(spec.database)[spec.collection].create_index(spec.keys, name=spec.name, background=True)
+        created.append(spec)
+    return created
+
+
+def _hot_queries():
+    """(label, cursor) for representative hot-path queries, used with explain()."""
+    from datetime import datetime, timedelta
+
+    now = datetime.utcnow()
+    return [
+        ("attendance report range", hr_db()[ATTENDANCE].find(
+            {"attendence_time": {"$gte": now - timedelta(days=30), "$lt": now}}
+        ).sort([("attendence_time", -1), ("attendence_id", -1)]).limit(500)),
+        ("attendance by employee", hr_db()[ATTENDANCE].find({"employee_id": "__probe__"})),
+        ("employee by image_md5", hr_db()[EMPLOYEE].find({"image_md5": "__probe__"})),
+        ("HR GridFS by md5", hr_db()["fs.files"].find({"md5": "__probe__"})),
+        ("Global GridFS by md5", global_db()["fs.files"].find({"md5": "__probe__"})),
+        ("Global profile by employeeId", global_db()[PROFILE_COLLECTION].find({"employeeId": "__probe__"})),
+        ("lookup staleness probe", global_db()[PROFILE_COLLECTION].find(
+            {LOOKUP_MODIFIED_FIELD: {"$exists": True}}
+        ).sort([(LOOKUP_MODIFIED_FIELD, -1)]).limit(1)),
+    ]
+
+
+def _stages(plan):
+    stage = plan.get("stage")
+    if stage:
+        yield stage
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def explain_hot_queries():
+    """[(label, [plan stages], uses_collscan)] for the winning plan of each hot query."""
+    results = []
+    for label, cursor in _hot_queries():
+        plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(_stages(plan))
+        results.append((label, stages, "COLLSCAN" in stages))
+    return results
+
+
+def _describe(spec):
+    return f"{spec.database}.{spec.collection} {spec.keys}"
+
+
+def check_on_start():
+    """Startup check: report (or create) missing indexes and any collection scans."""
+    try:
+        if INDEX_CHECK_ON_START == "create":
+            for spec in ensure_indexes():
+                print(f"✅ Created index {_describe(spec)}")
+        else:
+            for spec in missing_indexes():
+                print(f"⚠️ Missing MongoDB index {_describe(spec)} (run manage.py ensure_indexes)")
+        for label, stages, collscan in explain_hot_queries():
+            if collscan:
+                print(f"⚠️ Collection scan in hot query '{label}': {' <- '.join(stages)}")
+    except Exception as e:
+        print(f"⚠️ MongoDB index check failed: {e}")
+
+
+def start():
+    """Called from EmployeesConfig.ready(); runs check_on_start() in a background thread."""
+    from employees.warmup import is_serving_process
+
+    if INDEX_CHECK_ON_START == "off" or not is_serving_process():
+        return
+    threading.Thread(target=check_on_start, name="mongo-index-check", daemon=True).start()
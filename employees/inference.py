@@ -0,0 +1,166 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from employees import metrics
+from employees.face_utils import imagefile_to_encoding, warm_up_models
+
+# Size of the inference pool in each web worker process. 0 runs inference in
+# the request thread (previous behaviour).
+INFERENCE_WORKERS = int(os.getenv("FACE_INFERENCE_WORKERS", "0"))
+# Requests allowed in the pool (running + queued) before new ones are refused.
+INFERENCE_MAX_PENDING = int(os.getenv("FACE_INFERENCE_MAX_PENDING", str(max(1, INFERENCE_WORKERS) * 4)))
+# Seconds to wait for a free slot, then for the result.
+INFERENCE_QUEUE_TIMEOUT = float(os.getenv("FACE_INFERENCE_QUEUE_TIMEOUT", "5"))
+INFERENCE_TIMEOUT = float(os.getenv("FACE_INFERENCE_TIMEOUT", "30"))
+
+
+class InferenceBusyError(Exception):
+    pass
+
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = None
+
+
+def is_enabled():
+    return INFERENCE_WORKERS > 0
+
+
+def _init_worker():
+    # Runs once per pool process; models then stay resident for every task
+    warm_up_models()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _get_pool():
+    global _pool, _pool_pid, _slots
+    with _lock:
+        # A pool inherited through fork is unusable; build one per process
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=INFERENCE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(INFERENCE_MAX_PENDING)
+        return _pool, _slots
+
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def start():
+    """Spawn the pool processes and wait until each one has loaded its models."""
+    pool, _ = _get_pool()
+    futures = [pool.submit(_ping) for _ in range(INFERENCE_WORKERS)]
+    for future in futures:
+        future.result()
+
+
+def _submit(fn, *args):
+    pool, slots = _get_pool()
+    if not slots.acquire(timeout=INFERENCE_QUEUE_TIMEOUT):
+        raise InferenceBusyError("Face inference pool is saturated")
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        slots.release()
+        _reset_pool()
+        raise InferenceBusyError("Face inference pool restarted")
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def _run(fn, *args):
+    future = _submit(fn, *args)
+    try:
+        return future.result(timeout=INFERENCE_TIMEOUT)
+    except TimeoutError:
+        future.cancel()
+        raise InferenceBusyError("Face inference timed out")
+    except BrokenProcessPool:
+        _reset_pool()
+        raise InferenceBusyError("Face inference pool restarted")
+
+
+def _as_bytes(data):
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, (bytearray, memoryview)):
+        return bytes(data)
+    data.seek(0)
+    return data.read()
+
+
+def _encode_timed(data):
+    # Runs in the pool process; the stage timings travel back with the result
+    timings = {}
+    return imagefile_to_encoding(data, timings=timings), timings
+
+
+def _record(timings, started=None):
+    metrics.observe_stages(timings)
+    if started is not None:
+        # Queueing, pickling and IPC around the pool
+        overhead = time.perf_counter() - started - sum(timings.values())
+        metrics.stage_seconds.observe(max(0.0, overhead), stage="pool_overhead")
+
+
+def encode_image(data) -> list:
+    """
+    Face encoding for image bytes or an uploaded file, computed in the inference
+    pool when enabled. Same contract as imagefile_to_encoding(); raises
+    InferenceBusyError when the pool cannot take the request in time.
+    Per-stage timings are recorded in employees.metrics.
+    """
+    if not is_enabled():
+        encoding, timings = _encode_timed(data)  # decodes straight from the upload buffer
+        _record(timings)
+        return encoding
+    started = time.perf_counter()
+    encoding, timings = _run(_encode_timed, _as_bytes(data))
+    _record(timings, started)
+    return encoding
+
+
+async def encode_image_async(data) -> list:
+    """
+    encode_image() for async views: the event loop never blocks on inference.
+    Inline mode runs in the loop's default thread executor; with the pool, the
+    result is awaited through asyncio.wrap_future().
+    """
+    loop = asyncio.get_running_loop()
+    if not is_enabled():
+        encoding, timings = await loop.run_in_executor(None, _encode_timed, data)
+        _record(timings)
+        return encoding
+
+    # Waiting for a free slot can block, so it happens off the loop too
+    started = time.perf_counter()
+    future = await loop.run_in_executor(None, _submit, _encode_timed, _as_bytes(data))
+    try:
+        encoding, timings = await asyncio.wait_for(asyncio.wrap_future(future), INFERENCE_TIMEOUT)
+        _record(timings, started)
+        return encoding
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise InferenceBusyError("Face inference timed out")
+    except BrokenProcessPool:
+        _reset_pool()
+        raise InferenceBusyError("Face inference pool restarted")
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+
+from pymongo import ReturnDocument
+
+from employees.mongo import DEPARTMENT_COLLECTION, DESIGNATION_COLLECTION, PROFILE_COLLECTION, global_db, hr_db
+
+# Seconds a cached map is served before a cheap staleness probe is run.
+LOOKUP_CACHE_TTL = float(os.getenv("LOOKUP_CACHE_TTL", "60"))
+# Seconds after which a map is rebuilt even if the probe saw no change
+# (covers in-place edits to documents without a modified timestamp).
+LOOKUP_CACHE_MAX_AGE = float(os.getenv("LOOKUP_CACHE_MAX_AGE", "3600"))
+# Timestamp field probed on the Global collections.
+LOOKUP_MODIFIED_FIELD = os.getenv("LOOKUP_MODIFIED_FIELD", "lastmodified_date")
+
+# Shared invalidation counter in the HR database, bumped by invalidate_all()
+GENERATION_COLLECTION = "lookup_cache_generation"
+GENERATION_ID = "global_lookups"
+
+# Collections probed by the caches below; indexes.py indexes LOOKUP_MODIFIED_FIELD on each
+LOOKUP_COLLECTIONS = (DEPARTMENT_COLLECTION, DESIGNATION_COLLECTION, PROFILE_COLLECTION)
+
+PROFILE_FIELDS = [
+    "employeeId", "employeeName", "email", "department", "designation", "mobileNumber",
+    "gender", "age", "primaryRole", "additionalRoles", "profileImage",
+]
+
+
+def _generation():
+    doc = hr_db()[GENERATION_COLLECTION].find_one({"_id": GENERATION_ID})
+    return doc["value"] if doc else 0
+
+
+def _collection_probe(collection):
+    """(count, newest _id, newest modified timestamp): changes whenever rows are added, removed or edited."""
+    col = global_db()[collection]
+    newest = col.find_one({}, projection={"_id": 1}, sort=[("_id", -1)])
+    modified = col.find_one(
+        {LOOKUP_MODIFIED_FIELD: {"$exists": True}},
+        projection={LOOKUP_MODIFIED_FIELD: 1},
+        sort=[(LOOKUP_MODIFIED_FIELD, -1)],
+    )
+    return (
+        col.estimated_document_count(),
+        newest and newest["_id"],
+        modified and modified.get(LOOKUP_MODIFIED_FIELD),
+    )
+
+
+class LookupCache:
+    """
+    A value built from Global collections, served from memory for `ttl` seconds.
+    After that a probe (count / newest _id / newest modified time, plus the shared
+    generation counter) decides whether the value is rebuilt or kept for another ttl.
+    """
+
+    def __init__(self, collection, build, ttl=LOOKUP_CACHE_TTL, max_age=LOOKUP_CACHE_MAX_AGE):
+        self.collection = collection
+        self.build = build
+        self.ttl = ttl
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+
+    def _probe(self):
+        return (_generation(), _collection_probe(self.collection))
+
+    def get(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._value is None or now - self._built_at > self.max_age:
+                self._rebuild(now)
+            elif now - self._checked_at > self.ttl:
+                self._checked_at = now
+                if self._probe() != self._version:
+                    self._rebuild(now)
+            return self._value
+
+    def _rebuild(self, now):
+        version = self._probe()
+        self._value = self.build(global_db()[self.collection])
+        self._version = version
+        self._built_at = self._checked_at = now
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+_departments = LookupCache(
+    DEPARTMENT_COLLECTION,
+    lambda col: {
+        d.get('department_code'): d.get('department_name')
+        for d in col.find({'is_active': True}, {'department_code': 1, 'department_name': 1})
+    },
+)
+_designations = LookupCache(
+    DESIGNATION_COLLECTION,
+    lambda col: {
+        d.get('Designation_code'): d.get('designation')
+        for d in col.find({'is_active': True}, {'Designation_code': 1, 'designation': 1})
+    },
+)
+_profiles = LookupCache(
+    PROFILE_COLLECTION,
+    lambda col: list(col.find({}, {field: 1 for field in PROFILE_FIELDS})),
+)
+_caches = (_departments, _designations, _profiles)
+
+_directory_lock = threading.Lock()
+_directory = {"sources": None, "value": None}
+
+
+def department_map():
+    """{department_code: department_name} for active departments."""
+    return _departments.get()
+
+
+def designation_map():
+    """{Designation_code: designation} for active designations."""
+    return _designations.get()
+
+
+def global_profiles():
+    """All Global profile documents, limited to PROFILE_FIELDS. Treat as read-only."""
+    return _profiles.get()
+
+
+def employee_directory():
+    """
+    {employeeId: {employeeName, department, designation}} with department and
+    designation codes resolved to names. Rebuilt only when one of its sources is.
+    """
+    sources = (department_map(), designation_map(), global_profiles())
+    dept_map, desig_map, profiles = sources
+    with _directory_lock:
+        # Holding the source objects (not their ids) means a rebuilt map can never
+        # be mistaken for the old one because it reused a freed address.
+        previous = _directory["sources"]
+        if previous is None or any(new is not old for new, old in zip(sources, previous)):
+            _directory["value"] = {
+                emp.get("employeeId"): {
+                    "employeeName": emp.get("employeeName"),
+                    "department": dept_map.get(emp.get("department"), emp.get("department")),
+                    "designation": desig_map.get(emp.get("designation"), emp.get("designation")),
+                }
+                for emp in profiles
+            }
+            _directory["sources"] = sources
+        return _directory["value"]
+
+
+def invalidate_all():
+    """
+    Drop this process's maps and bump the shared generation counter so every
+    other worker rebuilds at its next probe (within LOOKUP_CACHE_TTL seconds).
+    """
+    doc = hr_db()[GENERATION_COLLECTION].find_one_and_update(
+        {"_id": GENERATION_ID},
+        {"$inc": {"value": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    for cache in _caches:
+        cache.invalidate()
+    return doc["value"]
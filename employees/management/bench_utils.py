@@ -0,0 +1,7 @@
+import numpy as np
+
+
+def percentiles(samples):
+    """(p50, p95) in milliseconds of a list of durations in seconds."""
+    ms = np.asarray(samples) * 1000.0
+    return np.percentile(ms, 50), np.percentile(ms, 95)
@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from employees.models import Employee
+from employees.mongo import hr_db
+from employees.storage import find_images_by_md5, open_image
+from employees.thumbnails import DERIVATIVE_BUCKET, THUMBNAIL_FORMAT, THUMBNAIL_SIZES, store_derivatives
+
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnail derivatives for existing employee images, in bounded parallel batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def _missing_in_batch(self, md5s):
+        """md5s of this batch that lack at least one configured derivative size."""
+        have = {}
+        for doc in hr_db()[f"{DERIVATIVE_BUCKET}.files"].find(
+            {"image_md5": {"$in": md5s}, "format": THUMBNAIL_FORMAT}, {"image_md5": 1, "size": 1}
+        ):
+            have.setdefault(doc["image_md5"], set()).add(doc["size"])
+        return [m for m in md5s if not set(THUMBNAIL_SIZES) <= have.get(m, set())]
+
+    def _backfill_one(self, md5, label, file_doc):
+        return store_derivatives(md5, open_image(label, file_doc["_id"]).read())
+
+    def handle(self, *args, **options):
+        md5s = sorted(set(
+            Employee.objects.exclude(image_md5__isnull=True).exclude(image_md5="")
+            .values_list("image_md5", flat=True)
+        ))
+        batch_size = options["batch_size"]
+        created = skipped = failed = 0
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for offset in range(0, len(md5s), batch_size):
+                batch = md5s[offset:offset + batch_size]
+                missing = self._missing_in_batch(batch)
+                skipped += len(batch) - len(missing)
+                originals = find_images_by_md5(missing)
+                failed += len(missing) - len(originals)  # original image not in GridFS
+
+                futures = {
+                    md5: pool.submit(self._backfill_one, md5, label, file_doc)
+                    for md5, (label, file_doc) in originals.items()
+                }
+                for md5, future in futures.items():
+                    try:
+                        created += len(future.result())
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"{md5}: {e}")
+
+                self.stdout.write(f"{min(offset + batch_size, len(md5s))}/{len(md5s)} images processed")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} derivatives; {skipped} images already complete; {failed} failed "
+            f"in {time.perf_counter() - start:.1f}s"
+        ))
@@ -0,0 +1,128 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from employees import reports
+from employees.mongo import DEPARTMENT_COLLECTION, DESIGNATION_COLLECTION, PROFILE_COLLECTION, get_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the attendance report join: Python-side join over full Global scans "
+        "vs the aggregation pipelines, on a seeded scratch dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hr-db", default="HR_report_bench")
+        parser.add_argument("--global-db", default="Global_report_bench")
+        parser.add_argument("--employees", type=int, default=5000)
+        parser.add_argument("--rows", type=int, default=200000)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--range-days", type=int, default=30, help="Report range, ending at the newest row.")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--reseed", action="store_true", help="Drop and reseed the scratch databases.")
+
+    def _seed(self, hr, glob, options):
+        rng = random.Random(0)
+        n_dept, n_desig = 40, 120
+        glob[DEPARTMENT_COLLECTION].insert_many(
+            {"department_code": f"D{i}", "department_name": f"Department {i}", "is_active": True}
+            for i in range(n_dept)
+        )
+        glob[DESIGNATION_COLLECTION].insert_many(
+            {"Designation_code": f"G{i}", "designation": f"Designation {i}", "is_active": True}
+            for i in range(n_desig)
+        )
+        glob[PROFILE_COLLECTION].insert_many(
+            {
+                "employeeId": f"E{i:06d}",
+                "employeeName": f"Employee {i}",
+                "email": f"employee{i}@example.com",
+                "department": f"D{rng.randrange(n_dept)}",
+                "designation": f"G{rng.randrange(n_desig)}",
+                "mobileNumber": "9" * 10,
+                "address": "x" * 200,  # unused fields make the Python join pay for transfer
+            }
+            for i in range(options["employees"])
+        )
+        glob[PROFILE_COLLECTION].create_index("employeeId")
+
+        start = datetime(2025, 1, 1)
+        span = options["days"] * 86400
+        batch = []
+        for i in range(options["rows"]):
+            batch.append({
+                "attendence_id": i + 1,
+                "employee_id": f"E{rng.randrange(options['employees']):06d}",
+                "device_id": f"KIOSK_{rng.randrange(20)}",
+                "attendence_time": start + timedelta(seconds=rng.randrange(span)),
+                "attendence_type": rng.choice(["IN", "OUT"]),
+                "confidence": rng.random() * 0.5,
+            })
+            if len(batch) == 10000:
+                hr[reports.ATTENDANCE_COLLECTION].insert_many(batch)
+                batch = []
+        if batch:
+            hr[reports.ATTENDANCE_COLLECTION].insert_many(batch)
+        hr[reports.ATTENDANCE_COLLECTION].create_index([("attendence_time", -1), ("attendence_id", -1)])
+
+    def _python_join(self, hr, glob, from_date, to_date):
+        """The original view logic: scan all three Global collections, join in Python."""
+        dept_map = {
+            d.get('department_code'): d.get('department_name')
+            for d in glob[DEPARTMENT_COLLECTION].find({'is_active': True})
+        }
+        desig_map = {
+            d.get('Designation_code'): d.get('designation')
+            for d in glob[DESIGNATION_COLLECTION].find({'is_active': True})
+        }
+        employee_map = {}
+        for emp in glob[PROFILE_COLLECTION].find():
+            employee_map[emp.get("employeeId")] = {
+                "employeeName": emp.get("employeeName"),
+                "department": dept_map.get(emp.get("department"), emp.get("department")),
+                "designation": desig_map.get(emp.get("designation"), emp.get("designation")),
+            }
+        records = hr[reports.ATTENDANCE_COLLECTION].find(
+            {"attendence_time": {"$gte": from_date, "$lt": to_date}}
+        ).sort([("attendence_time", -1), ("attendence_id", -1)])
+        return [reports.report_row(r, employee_map) for r in records]
+
+    def _aggregate(self, hr, glob, from_date, to_date):
+        attendance = hr[reports.ATTENDANCE_COLLECTION]
+        employee_ids = attendance.distinct("employee_id", reports._attendance_match(from_date, to_date))
+        directory = {
+            d["employeeId"]: d
+            for d in glob[PROFILE_COLLECTION].aggregate(
+                reports.directory_pipeline(employee_ids), allowDiskUse=True
+            )
+        }
+        cursor = attendance.aggregate(reports.attendance_pipeline(from_date, to_date), allowDiskUse=True)
+        return [reports.report_row(r, directory) for r in cursor]
+
+    def handle(self, *args, **options):
+        client = get_client()
+        if options["reseed"]:
+            client.drop_database(options["hr_db"])
+            client.drop_database(options["global_db"])
+        hr, glob = client[options["hr_db"]], client[options["global_db"]]
+        if hr[reports.ATTENDANCE_COLLECTION].estimated_document_count() == 0:
+            self.stdout.write("Seeding scratch databases...")
+            self._seed(hr, glob, options)
+
+        newest = hr[reports.ATTENDANCE_COLLECTION].find_one(sort=[("attendence_time", -1)])["attendence_time"]
+        to_date = newest + timedelta(seconds=1)
+        from_date = to_date - timedelta(days=options["range_days"])
+
+        for label, run in (("python join", self._python_join), ("aggregation", self._aggregate)):
+            times = []
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                rows = run(hr, glob, from_date, to_date)
+                times.append(time.perf_counter() - start)
+            self.stdout.write(
+                f"{label:<12} rows={len(rows)}  best={min(times) * 1000:.0f} ms  "
+                f"mean={sum(times) / len(times) * 1000:.0f} ms"
+            )
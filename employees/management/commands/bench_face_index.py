@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from employees.face_index import IVFIndex, exact_search
+from employees.management.bench_utils import percentiles
+
+
+class Command(BaseCommand):
+    help = "Benchmark IVF approximate search against exact search on synthetic 128-d face encodings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,50000",
+                            help="Comma-separated gallery sizes to test.")
+        parser.add_argument("--queries", type=int, default=500)
+        parser.add_argument("--nlist", type=int, default=0, help="0 = derive from gallery size.")
+        parser.add_argument("--nprobe", default="4,8,16,32", help="Comma-separated nprobe values.")
+        parser.add_argument("--noise", type=float, default=0.025,
+                            help="Per-dimension std of probe noise around the enrolled encoding.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        nprobes = [int(v) for v in options["nprobe"].split(",")]
+
+        for size in (int(v) for v in options["sizes"].split(",")):
+            # face_recognition encodings are roughly N(0, 0.09) per dimension
+            gallery = rng.normal(0.0, 0.09, (size, 128)).astype(np.float32)
+            sq_norms = np.einsum("ij,ij->i", gallery, gallery)
+            targets = rng.integers(0, size, options["queries"])
+            probes = gallery[targets] + rng.normal(0.0, options["noise"], (len(targets), 128)).astype(np.float32)
+
+            exact_rows, exact_times = [], []
+            for probe in probes:
+                start = time.perf_counter()
+                row, _ = exact_search(probe, gallery, sq_norms)
+                exact_times.append(time.perf_counter() - start)
+                exact_rows.append(row)
+            p50, p95 = percentiles(exact_times)
+            self.stdout.write(f"\nN={size}  exact: p50={p50:.3f} ms  p95={p95:.3f} ms")
+
+            for nprobe in nprobes:
+                index = IVFIndex(nlist=options["nlist"], nprobe=nprobe, seed=options["seed"])
+                start = time.perf_counter()
+                index.build(gallery)
+                build_s = time.perf_counter() - start
+
+                hits, times = 0, []
+                for probe, expected in zip(probes, exact_rows):
+                    start = time.perf_counter()
+                    row, _ = index.search(probe, gallery, sq_norms)
+                    times.append(time.perf_counter() - start)
+                    hits += row == expected
+                p50, p95 = percentiles(times)
+                self.stdout.write(
+                    f"N={size}  ivf nlist={len(index.centroids)} nprobe={nprobe}: "
+                    f"p50={p50:.3f} ms  p95={p95:.3f} ms  recall@1={hits / len(probes):.4f}  "
+                    f"build={build_s:.2f} s"
+                )
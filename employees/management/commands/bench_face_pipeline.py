@@ -0,0 +1,79 @@
+import time
+from io import BytesIO
+
+import face_recognition
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.face_utils import check_liveness, imagefile_to_encoding, warm_up_models
+
+STAGES = ("decode", "detect", "liveness", "encode")
+
+
+def _legacy_pipeline(image_bytes, timings):
+    """The pre-single-pass pipeline: native-resolution decode, DeepFace detects for liveness, then dlib detects again."""
+    start = time.perf_counter()
+    img = face_recognition.load_image_file(BytesIO(image_bytes))
+    timings["decode"] = timings.get("decode", 0.0) + time.perf_counter() - start
+
+    start = time.perf_counter()
+    check_liveness(img)
+    timings["liveness"] = timings.get("liveness", 0.0) + time.perf_counter() - start
+
+    start = time.perf_counter()
+    face_recognition.face_encodings(img)
+    # detect + encode are one call in the legacy path
+    timings["detect+encode"] = timings.get("detect+encode", 0.0) + time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Per-stage timing of the face pipeline: legacy double detection vs single detection pass."
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="+", help="Image files containing one face each.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--max-dims", default="640,1024,1600",
+                            help="Decode sizes to compare against native resolution (encoding drift and time).")
+
+    def _report(self, label, timings, runs):
+        total = sum(timings.values())
+        parts = "  ".join(f"{stage}={seconds / runs * 1000:.1f}ms" for stage, seconds in timings.items())
+        self.stdout.write(f"{label:<12} total={total / runs * 1000:.1f}ms  {parts}")
+
+    def handle(self, *args, **options):
+        images = []
+        for path in options["images"]:
+            try:
+                with open(path, "rb") as fh:
+                    images.append(fh.read())
+            except OSError as e:
+                raise CommandError(f"Cannot read {path}: {e}")
+
+        self.stdout.write("Loading models...")
+        warm_up_models()
+        check_liveness(face_recognition.load_image_file(BytesIO(images[0])))  # legacy detector
+
+        runs = len(images) * options["repeat"]
+        legacy, single = {}, {}
+        for _ in range(options["repeat"]):
+            for image_bytes in images:
+                _legacy_pipeline(image_bytes, legacy)
+                imagefile_to_encoding(image_bytes, timings=single)
+
+        self._report("legacy", legacy, runs)
+        self._report("single-pass", {s: single.get(s, 0.0) for s in STAGES}, runs)
+
+        # Accuracy check for the reduced-resolution decode: distance between the
+        # native-resolution encoding and the downscaled one (match threshold is 0.5)
+        native = [imagefile_to_encoding(image_bytes, max_dim=0) for image_bytes in images]
+        for max_dim in (int(v) for v in options["max_dims"].split(",")):
+            timings, drift, misses = {}, [], 0
+            for image_bytes, reference in zip(images, native):
+                encoding = imagefile_to_encoding(image_bytes, timings=timings, max_dim=max_dim)
+                if not encoding or not reference:
+                    misses += 1
+                    continue
+                drift.append(float(np.linalg.norm(np.array(encoding) - np.array(reference))))
+            drift_text = f"drift max={max(drift):.4f} mean={np.mean(drift):.4f}" if drift else "drift n/a"
+            self._report(f"max_dim={max_dim}", {s: timings.get(s, 0.0) for s in STAGES}, len(images))
+            self.stdout.write(f"{'':<12} {drift_text}  no-face={misses}")
@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from employees.face_gallery import MATCH_THRESHOLD
+from employees.face_index import owner_search
+from employees.management.bench_utils import percentiles
+
+
+class Command(BaseCommand):
+    help = ("Benchmark multi-template matching (K templates per employee) on synthetic encodings: "
+            "accuracy, false accepts and latency for each K.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=5000)
+        parser.add_argument("--templates", default="1,2,3,5", help="Comma-separated K values to test.")
+        parser.add_argument("--queries", type=int, default=1000)
+        parser.add_argument("--looks", type=int, default=4,
+                            help="Distinct appearances per employee (haircut, glasses, lighting...).")
+        parser.add_argument("--look-noise", type=float, default=0.025,
+                            help="Per-dimension std of an appearance around the identity.")
+        parser.add_argument("--noise", type=float, default=0.015,
+                            help="Per-dimension std of capture noise on every encoding.")
+        parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        n, looks = options["employees"], options["looks"]
+        ks = [int(v) for v in options["templates"].split(",")]
+        k_max = max(ks)
+
+        def capture(vectors):
+            return (vectors + rng.normal(0.0, options["noise"], vectors.shape)).astype(np.float32)
+
+        # face_recognition encodings are roughly N(0, 0.09) per dimension
+        identities = rng.normal(0.0, 0.09, (n, 128))
+        appearance = identities[:, None, :] + rng.normal(0.0, options["look_noise"], (n, looks, 128))
+
+        # Enrolled templates, newest first: each one a capture of a random look
+        enrolled = capture(appearance[np.arange(n)[:, None], rng.integers(0, looks, (n, k_max))])
+
+        targets = rng.integers(0, n, options["queries"])
+        probes = capture(appearance[targets, rng.integers(0, looks, len(targets))])
+        impostors = capture(rng.normal(0.0, 0.09, (options["queries"], 128)))
+
+        threshold_sq = options["threshold"] ** 2
+        for k in ks:
+            matrix = np.ascontiguousarray(enrolled[:, :k].reshape(-1, 128))
+            sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+            owners = np.repeat(np.arange(n), k)
+
+            hits, times = 0, []
+            for probe, expected in zip(probes, targets):
+                start = time.perf_counter()
+                owner, sq_dist = owner_search(probe, matrix, sq_norms, owners, n)
+                times.append(time.perf_counter() - start)
+                hits += owner == expected and sq_dist <= threshold_sq
+            false_accepts = sum(
+                owner_search(probe, matrix, sq_norms, owners, n)[1] <= threshold_sq for probe in impostors
+            )
+
+            p50, p95 = percentiles(times)
+            self.stdout.write(
+                f"N={n} K={k} rows={matrix.shape[0]}: accuracy={hits / len(probes):.4f}  "
+                f"false_accept={false_accepts / len(impostors):.4f}  p50={p50:.3f} ms  p95={p95:.3f} ms"
+            )
@@ -0,0 +1,251 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import gridfs
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from django.utils import timezone
+from pymongo import UpdateOne
+
+from employees.face_utils import imagefile_to_encoding, warm_up_models
+from employees.fields import pack_encoding
+from employees.models import ENCODING_HISTORY_LIMIT, Employee, EmployeeEncodingHistory
+from employees.mongo import PROFILE_COLLECTION, global_db, hr_db
+from employees.storage import read_profile_image
+from employees.thumbnails import store_derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode faces for all Global profiles whose image is not enrolled yet, on a process pool. "
+        "Progress is checkpointed so an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--checkpoint", default="enroll_from_global.checkpoint.json")
+        parser.add_argument("--reset", action="store_true", help="Ignore an existing checkpoint.")
+        parser.add_argument("--retry-failed", action="store_true",
+                            help="Retry profiles that failed in a previous run.")
+
+    # ---- Checkpoint ----
+
+    def _load_checkpoint(self, path, reset):
+        if reset or not os.path.exists(path):
+            return {"done": [], "failed": {}}
+        with open(path) as fh:
+            return json.load(fh)
+
+    def _save_checkpoint(self, path, checkpoint):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(checkpoint, fh)
+        os.replace(tmp, path)  # atomic: a crash never leaves a half-written checkpoint
+
+    # ---- Batches ----
+
+    def _gridfs_md5s(self, profiles):
+        """{profileImage id: GridFS md5} for a batch, in one query."""
+        ids = []
+        for p in profiles:
+            try:
+                ids.append(ObjectId(str(p["profileImage"])))
+            except InvalidId:
+                pass
+        return {
+            str(doc["_id"]): doc.get("md5")
+            for doc in global_db()["fs.files"].find({"_id": {"$in": ids}}, {"md5": 1})
+        }
+
+    def _process_batch(self, pool, profiles, enrolled_md5, checkpoint, stats):
+        gridfs_md5 = self._gridfs_md5s(profiles)
+
+        # Skip profiles whose stored image is already the enrolled one, then download the rest
+        jobs = []
+        for p in profiles:
+            emp_id, image_id = p["employeeId"], str(p["profileImage"])
+            if image_id not in gridfs_md5:
+                self._fail(emp_id, "profile image not found", checkpoint, stats)
+                continue
+            if gridfs_md5[image_id] and gridfs_md5[image_id] == enrolled_md5.get(emp_id):
+                stats["unchanged"] += 1
+                checkpoint["done"].append(emp_id)
+                continue
+            try:
+                image_bytes, image_md5 = read_profile_image(image_id)
+            except gridfs.NoFile as e:
+                self._fail(emp_id, f"profile image not readable: {e}", checkpoint, stats)
+                continue
+            if image_md5 == enrolled_md5.get(emp_id):
+                stats["unchanged"] += 1
+                checkpoint["done"].append(emp_id)
+                continue
+            jobs.append((p, image_bytes, image_md5, pool.submit(imagefile_to_encoding, image_bytes)))
+
+        new_rows, updates = [], []
+        for p, image_bytes, image_md5, future in jobs:
+            emp_id = p["employeeId"]
+            try:
+                encoding = future.result()
+            except Exception as e:
+                self._fail(emp_id, f"encoding failed: {e}", checkpoint, stats)
+                continue
+            if not encoding:
+                stats["no_face"] += 1
+                checkpoint["failed"][emp_id] = "no face detected"
+                continue
+
+            try:
+                store_derivatives(image_md5, image_bytes)
+            except Exception as e:
+                self.stderr.write(f"{emp_id}: thumbnail generation failed: {e}")
+
+            if emp_id in enrolled_md5:
+                updates.append((emp_id, p.get("employeeName", ""), encoding, image_md5))
+            else:
+                new_rows.append(Employee(
+                    employee_id=emp_id,
+                    name=p.get("employeeName", ""),
+                    current_face_encoding=encoding,
+                    image_md5=image_md5,
+                ))
+
+        self._update_rows(updates, enrolled_md5, checkpoint, stats)
+        self._create_rows(new_rows, enrolled_md5, checkpoint, stats)
+
+    def _fail(self, emp_id, reason, checkpoint, stats):
+        self.stderr.write(f"{emp_id}: {reason}")
+        stats["failed"] += 1
+        checkpoint["failed"][emp_id] = reason
+
+    def _done(self, emp_id, image_md5, enrolled_md5, checkpoint):
+        enrolled_md5[emp_id] = image_md5
+        checkpoint["failed"].pop(emp_id, None)
+        checkpoint["done"].append(emp_id)
+
+    def _update_rows(self, updates, enrolled_md5, checkpoint, stats):
+        """
+        Re-enrol existing employees with one bulk_write, moving their previous
+        encodings to EmployeeEncodingHistory like Employee.update_encoding().
+        (djongo cannot translate the CASE WHEN update that QuerySet.bulk_update emits.)
+        """
+        if not updates:
+            return
+        previous = Employee.objects.filter(employee_id__in=[u[0] for u in updates]).values_list(
+            "employee_id", "current_face_encoding", "image_md5")
+        history = [
+            EmployeeEncodingHistory(employee_id=emp_id, encoding=encoding, image_md5=image_md5)
+            for emp_id, encoding, image_md5 in previous
+            if encoding is not None
+        ]
+
+        now = timezone.now()
+        ops = []
+        for emp_id, name, encoding, image_md5 in updates:
+            fields = {"current_face_encoding": pack_encoding(encoding), "image_md5": image_md5,
+                      "lastmodified_date": now}
+            if name:
+                fields["name"] = name
+            ops.append(UpdateOne({"employee_id": emp_id}, {"$set": fields}))
+        hr_db()[Employee._meta.db_table].bulk_write(ops, ordered=False)
+
+        if history and ENCODING_HISTORY_LIMIT > 0:
+            EmployeeEncodingHistory.objects.bulk_create(history)
+            for row in history:
+                EmployeeEncodingHistory.prune(row.employee_id)
+        for emp_id, _, _, image_md5 in updates:
+            self._done(emp_id, image_md5, enrolled_md5, checkpoint)
+        stats["updated"] += len(updates)
+
+    def _create_rows(self, rows, enrolled_md5, checkpoint, stats):
+        """bulk_create new employees; on a duplicate employeeId, insert row by row and log the duplicates."""
+        if not rows:
+            return
+        try:
+            Employee.objects.bulk_create(rows)
+        except DatabaseError as e:
+            # djongo reports duplicate keys as DatabaseError (IntegrityError's base)
+            self.stderr.write(f"Batch insert failed ({e}); inserting {len(rows)} employees one by one")
+        else:
+            for row in rows:
+                self._done(row.employee_id, row.image_md5, enrolled_md5, checkpoint)
+            stats["enrolled"] += len(rows)
+            return
+
+        # The bulk insert stops at the first duplicate; rows before it are already stored
+        stored = dict(Employee.objects.filter(employee_id__in=[row.employee_id for row in rows])
+                      .values_list("employee_id", "image_md5"))
+        for row in rows:
+            if row.employee_id in stored:
+                if stored.pop(row.employee_id) != row.image_md5:
+                    self._fail(row.employee_id, "duplicate employeeId", checkpoint, stats)
+                    continue
+            else:
+                try:
+                    row.save(force_insert=True)
+                except DatabaseError as e:
+                    self._fail(row.employee_id, f"insert failed: {e}", checkpoint, stats)
+                    continue
+            self._done(row.employee_id, row.image_md5, enrolled_md5, checkpoint)
+            stats["enrolled"] += 1
+
+    def handle(self, *args, **options):
+        checkpoint = self._load_checkpoint(options["checkpoint"], options["reset"])
+        skip = set(checkpoint["done"])
+        if not options["retry_failed"]:
+            skip |= set(checkpoint["failed"])
+
+        enrolled_md5 = dict(Employee.objects.values_list("employee_id", "image_md5"))
+        profiles = global_db()[PROFILE_COLLECTION].find(
+            {"profileImage": {"$nin": [None, ""]}},
+            {"employeeId": 1, "employeeName": 1, "profileImage": 1},
+            no_cursor_timeout=True,
+        )
+
+        stats = dict.fromkeys(("enrolled", "updated", "unchanged", "no_face", "failed"), 0)
+        seen = 0
+        start = time.perf_counter()
+        pool = ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_up_models,
+        )
+        try:
+            batch = []
+            for profile in profiles:
+                profile["employeeId"] = str(profile.get("employeeId"))
+                if profile["employeeId"] in skip:
+                    continue
+                batch.append(profile)
+                if len(batch) == options["batch_size"]:
+                    self._process_batch(pool, batch, enrolled_md5, checkpoint, stats)
+                    self._save_checkpoint(options["checkpoint"], checkpoint)
+                    seen += len(batch)
+                    batch = []
+                    self.stdout.write(f"{seen} profiles processed ({seen / (time.perf_counter() - start):.1f}/s)")
+            if batch:
+                self._process_batch(pool, batch, enrolled_md5, checkpoint, stats)
+                self._save_checkpoint(options["checkpoint"], checkpoint)
+                seen += len(batch)
+        finally:
+            profiles.close()
+            pool.shutdown()
+
+        elapsed = time.perf_counter() - start
+        encoded = stats["enrolled"] + stats["updated"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {seen} profiles in {elapsed:.1f}s ({seen / elapsed if elapsed else 0:.1f} profiles/s, "
+            f"{encoded / elapsed if elapsed else 0:.1f} encodings/s)"
+        ))
+        self.stdout.write(
+            f"  enrolled={stats['enrolled']}  updated={stats['updated']}  unchanged={stats['unchanged']}  "
+            f"no_face={stats['no_face']}  failed={stats['failed']}"
+        )
+        for emp_id, reason in list(checkpoint["failed"].items())[:20]:
+            self.stdout.write(f"  failed {emp_id}: {reason}")
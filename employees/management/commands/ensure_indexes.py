@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from employees import indexes
+
+
+class Command(BaseCommand):
+    help = "Create and verify the MongoDB indexes the HR hot paths rely on, and explain() the hot queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true",
+                            help="Only verify; exit with an error if any index is missing.")
+        parser.add_argument("--no-explain", action="store_true", help="Skip the explain() report.")
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            missing = indexes.missing_indexes()
+            for spec in missing:
+                self.stdout.write(self.style.WARNING(f"missing  {spec.database}.{spec.collection} {spec.keys}"))
+        else:
+            for spec in indexes.ensure_indexes():
+                self.stdout.write(self.style.SUCCESS(f"created  {spec.database}.{spec.collection} {spec.keys}"))
+            missing = indexes.missing_indexes()
+
+        if not missing:
+            self.stdout.write(self.style.SUCCESS(f"All {len(indexes.REQUIRED_INDEXES)} required indexes present."))
+
+        if not options["no_explain"]:
+            for label, stages, collscan in indexes.explain_hot_queries():
+                style = self.style.ERROR if collscan else self.style.SUCCESS
+                self.stdout.write(style(f"{'COLLSCAN' if collscan else 'ok':<9}{label}: {' <- '.join(stages)}"))
+
+        if missing:
+            raise CommandError(f"{len(missing)} required index(es) missing")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from employees import lookups
+
+
+class Command(BaseCommand):
+    help = "Invalidate the cached Global department/designation/profile lookup maps in every worker."
+
+    def handle(self, *args, **options):
+        generation = lookups.invalidate_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"Lookup cache generation is now {generation}; workers rebuild within "
+            f"{lookups.LOOKUP_CACHE_TTL:g}s."
+        ))
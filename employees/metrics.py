@@ -0,0 +1,203 @@
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+# In-process metrics, rendered in the Prometheus text format by the metrics
+# view. Recording is a dict update under a lock; nothing is computed until
+# a scrape.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Scrapers must send "Authorization: Bearer <METRICS_TOKEN>"; the endpoint is
+# off (404) while no token is configured.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1.0, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[bucket] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {state[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "face_stage_seconds", "Time spent per recognition pipeline stage.", ["stage"])
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by endpoint, method and status.", ["endpoint", "method", "status"])
+http_seconds = registry.histogram(
+    "http_request_seconds", "Time until the view returned a response, by endpoint.", ["endpoint", "method"])
+mongo_commands = registry.counter(
+    "mongo_commands_total", "MongoDB commands by name and outcome.", ["command", "outcome"])
+mongo_seconds = registry.histogram(
+    "mongo_command_seconds", "MongoDB command round-trip time.", ["command"])
+mark_cache_hits = registry.counter(
+    "mark_cache_hits_total", "/mark/ requests answered from a cache.", ["cache"])
+
+
+def stage(name):
+    """Context manager timing one pipeline stage: `with metrics.stage("match"): ...`."""
+    return stage_seconds.time(stage=name)
+
+
+def observe_stages(timings):
+    """Record a timings dict as filled by imagefile_to_encoding()."""
+    for name, seconds in timings.items():
+        stage_seconds.observe(seconds, stage=name)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Counts and times every command sent by any MongoClient (djongo's included)."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_commands.inc(command=event.command_name, outcome="succeeded")
+        mongo_seconds.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        mongo_commands.inc(command=event.command_name, outcome="failed")
+        mongo_seconds.observe(event.duration_micros / 1e6, command=event.command_name)
+
+
+class MetricsMiddleware:
+    """Per-endpoint request counts and latency; the endpoint is the matched URL route."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._async = asyncio.iscoroutinefunction(get_response)
+        if self._async:
+            # Lets Django call this middleware without a sync adapter
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self._async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    def _record(self, request, response, seconds):
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.route if match else "unmatched"
+        http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        http_seconds.observe(seconds, endpoint=endpoint, method=request.method)
+
+
+_started = False
+
+
+def start():
+    """Called from EmployeesConfig.ready(), before any MongoClient exists."""
+    global _started
+    if METRICS_ENABLED and not _started:
+        monitoring.register(MongoCommandListener())
+        _started = True
@@ -0,0 +1,73 @@
+import json
+
+from django.db import migrations
+from pymongo import UpdateOne
+
+import employees.fields
+from employees.fields import pack_encoding, unpack_encoding
+
+ENCODING_FIELDS = ("current_face_encoding", "face_encoding_data_history")
+BATCH_SIZE = 500
+
+
+# Same helper as in 0004_employeeencodinghistory; migrations don't import each other, keep both in sync.
+def _database(schema_editor):
+    """The pymongo Database of the connection being migrated (djongo's own client)."""
+    schema_editor.connection.ensure_connection()
+    return schema_editor.connection.connection
+
+
+def _convert(apps, schema_editor, to_stored, selector):
+    Employee = apps.get_model("employees", "Employee")
+    collection = _database(schema_editor)[Employee._meta.db_table]
+    query = {"$or": [{field: selector} for field in ENCODING_FIELDS]}
+
+    ops = []
+    for doc in collection.find(query, {field: 1 for field in ENCODING_FIELDS}):
+        update = {}
+        for field in ENCODING_FIELDS:
+            value = doc.get(field)
+            if value is not None:
+                update[field] = to_stored(value, field == "face_encoding_data_history")
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if len(ops) >= BATCH_SIZE:
+            collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+
+
+def pack_encodings(apps, schema_editor):
+    """Rewrite legacy list / stringified-list encodings as packed float32 Binary."""
+    _convert(apps, schema_editor, lambda value, multiple: pack_encoding(unpack_encoding(value, multiple)),
+             {"$type": ["array", "string"]})
+
+
+def unpack_encodings(apps, schema_editor):
+    """Back to the previous stringified-list format."""
+    def to_legacy(value, multiple):
+        arr = unpack_encoding(value, multiple)
+        return json.dumps([] if arr is None else arr.tolist())
+
+    _convert(apps, schema_editor, to_legacy, {"$type": "binData"})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_auto_20251218_0333'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employee',
+            name='current_face_encoding',
+            field=employees.fields.FaceEncodingField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='face_encoding_data_history',
+            field=employees.fields.FaceEncodingField(blank=True, default=None, multiple=True, null=True),
+        ),
+        migrations.RunPython(pack_encodings, unpack_encodings),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations, models
+
+import employees.fields
+from employees.fields import pack_encoding, unpack_encoding
+
+BATCH_SIZE = 500
+# Entries moved per employee: FACE_ENCODING_HISTORY_LIMIT's default when this
+# migration was written, frozen so the migration never depends on live settings.
+ENCODING_HISTORY_LIMIT = 10
+
+
+# Same helper as in 0003_packed_face_encodings; migrations don't import each other, keep both in sync.
+def _database(schema_editor):
+    """The pymongo Database of the connection being migrated (djongo's own client)."""
+    schema_editor.connection.ensure_connection()
+    return schema_editor.connection.connection
+
+
+def move_history(apps, schema_editor):
+    """Copy the newest embedded history entries into EmployeeEncodingHistory rows, oldest first."""
+    Employee = apps.get_model("employees", "Employee")
+    History = apps.get_model("employees", "EmployeeEncodingHistory")
+    collection = _database(schema_editor)[Employee._meta.db_table]
+    db_alias = schema_editor.connection.alias
+
+    rows = []
+    docs = collection.find(
+        {"face_encoding_data_history": {"$nin": [None, [], ""]}},
+        {"employee_id": 1, "face_encoding_data_history": 1},
+    )
+    for doc in docs:
+        history = unpack_encoding(doc["face_encoding_data_history"], multiple=True)
+        if history is None or ENCODING_HISTORY_LIMIT <= 0:
+            continue
+        for encoding in history[-ENCODING_HISTORY_LIMIT:]:
+            rows.append(History(employee_id=doc["employee_id"], encoding=encoding))
+        if len(rows) >= BATCH_SIZE:
+            History.objects.using(db_alias).bulk_create(rows)
+            rows = []
+    if rows:
+        History.objects.using(db_alias).bulk_create(rows)
+
+
+def restore_history(apps, schema_editor):
+    Employee = apps.get_model("employees", "Employee")
+    History = apps.get_model("employees", "EmployeeEncodingHistory")
+    collection = _database(schema_editor)[Employee._meta.db_table]
+    db_alias = schema_editor.connection.alias
+
+    by_employee = {}
+    for employee_id, encoding in History.objects.using(db_alias).order_by("created_date", "id").values_list("employee_id", "encoding"):
+        by_employee.setdefault(employee_id, []).append(unpack_encoding(encoding))
+    for employee_id, encodings in by_employee.items():
+        collection.update_one(
+            {"employee_id": employee_id},
+            {"$set": {"face_encoding_data_history": pack_encoding(encodings)}},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_packed_face_encodings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeEncodingHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_id', models.CharField(max_length=50)),
+                ('encoding', employees.fields.FaceEncodingField()),
+                ('image_md5', models.CharField(blank=True, max_length=64, null=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(move_history, restore_history),
+        migrations.RemoveField(
+            model_name='employee',
+            name='face_encoding_data_history',
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_employeeencodinghistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='site',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.CreateModel(
+            name='DeviceSite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(max_length=50)),
+                ('site', models.CharField(max_length=50)),
+            ],
+        ),
+    ]
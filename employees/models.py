@@ -15,21 +15,27 @@ User = get_user_model()  # assuming you have a user model for created_by / lastm
 
 from django.contrib.auth.models import User
 from django.db import models
+import os
+
+from employees.fields import FaceEncodingField
+
+# Past encodings kept per employee in EmployeeEncodingHistory (0 = keep none).
+ENCODING_HISTORY_LIMIT = int(os.getenv("FACE_ENCODING_HISTORY_LIMIT", "10"))
 
 class Employee(models.Model):
     employee_id = models.CharField(max_length=50, primary_key=True)
     name = models.CharField(max_length=100)
     
-    # Latest/current face encoding
-    current_face_encoding = models.JSONField(blank=True, null=True, default=list)
-    
-    # Store all past face encodings
-    face_encoding_data_history = models.JSONField(blank=True, null=True, default=list)
+    # Latest/current face encoding (packed float32, see employees.fields)
+    current_face_encoding = FaceEncodingField(blank=True, null=True, default=None)
     
     # Store image hash (for duplicate check)
     image_md5 = models.CharField(max_length=64, blank=True, null=True)
     
     is_active = models.BooleanField(default=True)
+
+    # Site (location) the employee punches at; empty = any site
+    site = models.CharField(max_length=50, blank=True, null=True)
     
     # Audit fields
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_biometrics')
@@ -37,19 +43,58 @@ class Employee(models.Model):
     lastmodified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='modified_biometrics')
     lastmodified_date = models.DateTimeField(auto_now=True)
 
+    # Columns needed by matching and status checks; use with .only(*Employee.HOT_FIELDS)
+    HOT_FIELDS = ("employee_id", "name", "is_active", "site", "current_face_encoding")
+
     def update_encoding(self, new_encoding, new_image_md5=None):
-        """Save previous encoding to history, update current encoding and optional image MD5."""
-        if self.current_face_encoding:
-            self.face_encoding_data_history.append(self.current_face_encoding)
+        """Move the previous encoding to EmployeeEncodingHistory, update current encoding and optional image MD5."""
+        if self.current_face_encoding is not None:
+            EmployeeEncodingHistory.record(self.employee_id, self.current_face_encoding, self.image_md5)
         self.current_face_encoding = new_encoding
         if new_image_md5:
             self.image_md5 = new_image_md5
-        self.save(update_fields=['current_face_encoding', 'face_encoding_data_history', 'image_md5', 'lastmodified_date'])
+        self.save(update_fields=['current_face_encoding', 'image_md5', 'lastmodified_date'])
 
     def __str__(self):
         return f"{self.employee_id} - {self.name} - Active: {self.is_active}"
 
 
+class EmployeeEncodingHistory(models.Model):
+    """
+    Append-only log of replaced face encodings, kept out of the Employee
+    document so hot-path reads don't carry it. Only the newest
+    ENCODING_HISTORY_LIMIT rows per employee are retained.
+    """
+    employee_id = models.CharField(max_length=50)
+    encoding = FaceEncodingField()
+    image_md5 = models.CharField(max_length=64, blank=True, null=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def record(cls, employee_id, encoding, image_md5=None, limit=None):
+        limit = ENCODING_HISTORY_LIMIT if limit is None else limit
+        if limit <= 0:
+            return
+        cls.objects.create(employee_id=employee_id, encoding=encoding, image_md5=image_md5)
+        cls.prune(employee_id, limit)
+
+    @classmethod
+    def prune(cls, employee_id, limit=None):
+        """Delete all but the newest `limit` entries of one employee."""
+        limit = ENCODING_HISTORY_LIMIT if limit is None else limit
+        ids = list(
+            cls.objects.filter(employee_id=employee_id)
+            .order_by("-created_date", "-id")
+            .values_list("id", flat=True)
+        )
+        stale = ids[limit:]
+        if stale:
+            cls.objects.filter(id__in=stale).delete()
+
+    def __str__(self):
+        return f"{self.employee_id} @ {self.created_date}"
+
+
 
 
 from django.db import models
@@ -68,6 +113,14 @@ class EmployeeAttendance(models.Model):
     def __str__(self):
         return f"{self.employee_id} - {self.attendence_type} @ {self.attendence_time}"
 
+class DeviceSite(models.Model):
+    """Maps a kiosk (the auth-user-id sent with /mark/) to a site it serves; one row per site."""
+    device_id = models.CharField(max_length=50)
+    site = models.CharField(max_length=50)
+
+    def __str__(self):
+        return f"{self.device_id} -> {self.site}"
+
 class Register(models.Model):
     name = models.CharField(max_length=500)
     role = models.CharField(max_length=500)
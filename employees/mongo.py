@@ -0,0 +1,79 @@
+import os
+import threading
+
+import gridfs
+from pymongo import MongoClient
+
+# One MongoClient (and connection pool) per process, shared by every view.
+MONGO_HOST = os.getenv("GLOBAL_DB_HOST")
+HR_DB_NAME = os.getenv("HR_DB_NAME", "HR")
+GLOBAL_DB_NAME = os.getenv("GLOBAL_DB_NAME", "Global")
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+
+# Collections of the Global database owned by the Global profile service
+PROFILE_COLLECTION = "backend_diagnostics_profile"
+DEPARTMENT_COLLECTION = "backend_diagnostics_Departments"
+DESIGNATION_COLLECTION = "backend_diagnostics_Designation"
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+_handles = {}
+
+
+def get_client():
+    """
+    The process-wide MongoClient, created lazily.
+    A client inherited from a gunicorn master through fork is never reused;
+    the child builds its own on first use.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _lock:
+            if _client is None or _client_pid != os.getpid():
+                _handles.clear()
+                _client = MongoClient(
+                    MONGO_HOST,
+                    connect=False,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                )
+                _client_pid = os.getpid()
+    return _client
+
+
+def _cached(key, factory):
+    client = get_client()
+    handle = _handles.get(key)
+    if handle is None:
+        with _lock:
+            handle = _handles.setdefault(key, factory(client))
+    return handle
+
+
+def hr_db():
+    return _cached("hr_db", lambda client: client[HR_DB_NAME])
+
+
+def global_db():
+    return _cached("global_db", lambda client: client[GLOBAL_DB_NAME])
+
+
+def hr_fs(collection="fs"):
+    return _cached(("hr_fs", collection), lambda client: gridfs.GridFS(client[HR_DB_NAME], collection=collection))
+
+
+def global_fs(collection="fs"):
+    return _cached(
+        ("global_fs", collection), lambda client: gridfs.GridFS(client[GLOBAL_DB_NAME], collection=collection)
+    )
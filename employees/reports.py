@@ -0,0 +1,238 @@
+import base64
+import csv
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from employees.lookups import employee_directory
+from employees.models import EmployeeAttendance
+from employees.mongo import DEPARTMENT_COLLECTION, DESIGNATION_COLLECTION, PROFILE_COLLECTION, global_db, hr_db
+
+# Rows fetched per keyset query when streaming or building the full report.
+REPORT_CHUNK_SIZE = int(os.getenv("ATTENDANCE_REPORT_CHUNK_SIZE", "500"))
+REPORT_MAX_PAGE_SIZE = int(os.getenv("ATTENDANCE_REPORT_MAX_PAGE_SIZE", "1000"))
+
+REPORT_COLUMNS = [
+    "employee_id", "employee_name", "department", "designation",
+    "device_id", "attendence_type", "attendence_time", "confidence",
+]
+STREAM_FORMATS = ("ndjson", "csv")
+
+# "orm": Django queryset + cached Python lookup maps.
+# "aggregate": MongoDB aggregation pipelines that only return the needed fields.
+REPORT_ENGINES = ("orm", "aggregate")
+REPORT_ENGINE = os.getenv("ATTENDANCE_REPORT_ENGINE", "orm")
+
+ATTENDANCE_COLLECTION = EmployeeAttendance._meta.db_table
+
+_ATTENDANCE_FIELDS = (
+    "attendence_id", "employee_id", "device_id", "attendence_type", "attendence_time", "confidence",
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor for the position just after `row`."""
+    payload = json.dumps({"t": row["attendence_time"].isoformat(), "id": row["attendence_id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return datetime.fromisoformat(payload["t"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def attendance_chunk(from_date, to_date, after=None, limit=REPORT_CHUNK_SIZE):
+    """
+    One keyset page of attendance rows in the range, newest first, ordered by
+    (attendence_time, attendence_id) descending. `after` is a decoded cursor.
+    """
+    qs = EmployeeAttendance.objects.filter(
+        attendence_time__gte=from_date,
+        attendence_time__lt=to_date
+    )
+    if after:
+        after_time, after_id = after
+        qs = qs.filter(
+            Q(attendence_time__lt=after_time) | Q(attendence_time=after_time, attendence_id__lt=after_id)
+        )
+    return list(qs.order_by('-attendence_time', '-attendence_id').values(*_ATTENDANCE_FIELDS)[:limit])
+
+
+def iter_attendance(from_date, to_date, after=None, chunk_size=REPORT_CHUNK_SIZE):
+    """All attendance rows in the range, fetched chunk by chunk so memory stays flat."""
+    while True:
+        chunk = attendance_chunk(from_date, to_date, after=after, limit=chunk_size)
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        after = (last["attendence_time"], last["attendence_id"])
+
+
+def report_row(row, employee_map):
+    """Attendance row merged with the employee's Global profile details."""
+    emp_info = employee_map.get(row["employee_id"], {})
+    return {
+        "employee_id": row["employee_id"],
+        "employee_name": emp_info.get("employeeName", "Unknown"),
+        "department": emp_info.get("department", "N/A"),
+        "designation": emp_info.get("designation", "N/A"),
+        "device_id": row["device_id"],
+        "attendence_type": row["attendence_type"],
+        "attendence_time": row["attendence_time"],
+        "confidence": row["confidence"],
+    }
+
+
+# ---- Aggregation engine ----
+# Attendance lives in the HR database and profiles in Global, and $lookup cannot
+# cross databases. So the report runs two pipelines: attendance ($match/$sort/
+# $project) in HR, and profiles joined to departments and designations ($match
+# on the employee ids present/$lookup/$project) in Global.
+
+def _attendance_match(from_date, to_date, after=None):
+    match = {"attendence_time": {"$gte": from_date, "$lt": to_date}}
+    if after:
+        after_time, after_id = after
+        match["$or"] = [
+            {"attendence_time": {"$lt": after_time}},
+            {"attendence_time": after_time, "attendence_id": {"$lt": after_id}},
+        ]
+    return match
+
+
+def attendance_pipeline(from_date, to_date, after=None, limit=None):
+    pipeline = [
+        {"$match": _attendance_match(from_date, to_date, after)},
+        {"$sort": {"attendence_time": -1, "attendence_id": -1}},
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": dict({"_id": 0}, **{f: 1 for f in _ATTENDANCE_FIELDS})})
+    return pipeline
+
+
+def _code_lookup(collection, code_field, name_field, as_field):
+    return {"$lookup": {
+        "from": collection,
+        "let": {"code": f"${as_field}"},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": [f"${code_field}", "$$code"]}, "is_active": True}},
+            {"$project": {"_id": 0, name_field: 1}},
+        ],
+        "as": f"_{as_field}",
+    }}
+
+
+def directory_pipeline(employee_ids):
+    """Profiles of `employee_ids` with department/designation codes resolved to names."""
+    return [
+        {"$match": {"employeeId": {"$in": list(employee_ids)}}},
+        {"$project": {"_id": 0, "employeeId": 1, "employeeName": 1, "department": 1, "designation": 1}},
+        _code_lookup(DEPARTMENT_COLLECTION, "department_code", "department_name", "department"),
+        _code_lookup(DESIGNATION_COLLECTION, "Designation_code", "designation", "designation"),
+        {"$project": {
+            "employeeId": 1,
+            "employeeName": 1,
+            "department": {"$ifNull": [{"$arrayElemAt": ["$_department.department_name", 0]}, "$department"]},
+            "designation": {"$ifNull": [{"$arrayElemAt": ["$_designation.designation", 0]}, "$designation"]},
+        }},
+    ]
+
+
+def _aggregate_directory(employee_ids):
+    if not employee_ids:
+        return {}
+    cursor = global_db()[PROFILE_COLLECTION].aggregate(directory_pipeline(employee_ids), allowDiskUse=True)
+    return {d["employeeId"]: d for d in cursor}
+
+
+def _aware(row):
+    # pymongo returns naive UTC datetimes; the ORM returns aware ones when USE_TZ is on
+    if settings.USE_TZ and timezone.is_naive(row["attendence_time"]):
+        row["attendence_time"] = timezone.make_aware(row["attendence_time"], timezone.utc)
+    return row
+
+
+def _aggregate_rows(from_date, to_date, after=None):
+    attendance = hr_db()[ATTENDANCE_COLLECTION]
+    employee_ids = attendance.distinct("employee_id", _attendance_match(from_date, to_date, after))
+    directory = _aggregate_directory(employee_ids)
+    cursor = attendance.aggregate(
+        attendance_pipeline(from_date, to_date, after), allowDiskUse=True, batchSize=REPORT_CHUNK_SIZE
+    )
+    for row in cursor:
+        yield report_row(_aware(row), directory)
+
+
+def _aggregate_page(from_date, to_date, after, limit):
+    cursor = hr_db()[ATTENDANCE_COLLECTION].aggregate(
+        attendance_pipeline(from_date, to_date, after, limit=limit), allowDiskUse=True
+    )
+    chunk = [_aware(row) for row in cursor]
+    directory = _aggregate_directory({row["employee_id"] for row in chunk})
+    return chunk, directory
+
+
+# ---- Engine-independent entry points ----
+
+def report_rows(from_date, to_date, after=None, engine=REPORT_ENGINE):
+    """Generator of report rows for the whole range, newest first."""
+    if engine == "aggregate":
+        return _aggregate_rows(from_date, to_date, after)
+    employee_map = employee_directory()
+    return (report_row(r, employee_map) for r in iter_attendance(from_date, to_date, after=after))
+
+
+def report_page(from_date, to_date, after=None, limit=REPORT_MAX_PAGE_SIZE, engine=REPORT_ENGINE):
+    """(rows, next_cursor) for one page; next_cursor is None on the last page."""
+    if engine == "aggregate":
+        chunk, employee_map = _aggregate_page(from_date, to_date, after, limit)
+    else:
+        chunk = attendance_chunk(from_date, to_date, after=after, limit=limit)
+        employee_map = employee_directory()
+    next_cursor = encode_cursor(chunk[-1]) if len(chunk) == limit else None
+    return [report_row(r, employee_map) for r in chunk], next_cursor
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _ndjson_lines(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(REPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[c] for c in REPORT_COLUMNS])
+
+
+def streaming_report(rows, fmt, filename="attendance_report"):
+    """StreamingHttpResponse emitting `rows` as NDJSON or CSV."""
+    if fmt == "csv":
+        response = StreamingHttpResponse(_csv_lines(rows), content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    else:
+        response = StreamingHttpResponse(_ndjson_lines(rows), content_type="application/x-ndjson")
+    return response
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Employee
+from .fields import unpack_encoding
 from .models import EmployeeAttendance, Register
 from drf_extra_fields.fields import Base64ImageField
 from bson import ObjectId
@@ -11,11 +12,20 @@ class ObjectIdField(serializers.Field):
     def to_internal_value(self, data):
         return ObjectId(data)
 
+class FaceEncodingSerializerField(serializers.Field):
+    """Packed float32 encodings (employees.fields.FaceEncodingField) as plain JSON lists."""
+    def to_representation(self, value):
+        return value.tolist()
+
+    def to_internal_value(self, data):
+        return unpack_encoding(data)
+
 class EmployeeSerializer(serializers.ModelSerializer):
     id = serializers.CharField(read_only=True)
+    current_face_encoding = FaceEncodingSerializerField(allow_null=True, required=False)
     class Meta:
         model = Employee
-        fields = ['id', 'employee_id', 'current_face_encoding', 'face_encoding_data_history', 'is_active', 'created_by', 'created_date', 'lastmodified_by', 'lastmodified_date']
+        fields = ['id', 'employee_id', 'current_face_encoding', 'is_active', 'created_by', 'created_date', 'lastmodified_by', 'lastmodified_date']
 
 class EmployeeCreateSerializer(serializers.ModelSerializer):
     # Accept image via base64 or multipart upload
@@ -37,6 +47,8 @@ class AttendanceSerializer(serializers.ModelSerializer):
 
 
 class EmployeeStatusSerializer(serializers.ModelSerializer):
+    current_face_encoding = FaceEncodingSerializerField(allow_null=True, required=False)
+
     class Meta:
         model = Employee
         fields = ['employee_id', 'is_active', 'current_face_encoding']
@@ -0,0 +1,41 @@
+import os
+import threading
+import time
+
+from employees.models import DeviceSite
+
+# How long (seconds) a worker trusts its device -> sites map before re-reading it.
+DEVICE_SITE_CACHE_SECONDS = float(os.getenv("DEVICE_SITE_CACHE_SECONDS", "60"))
+
+_lock = threading.Lock()
+_cache = {"map": None, "loaded_at": 0.0}
+
+
+def _device_map():
+    with _lock:
+        if _cache["map"] is None or time.monotonic() - _cache["loaded_at"] > DEVICE_SITE_CACHE_SECONDS:
+            mapping = {}
+            for device_id, site in DeviceSite.objects.values_list("device_id", "site"):
+                mapping.setdefault(device_id, []).append(site)
+            _cache["map"] = mapping
+            _cache["loaded_at"] = time.monotonic()
+        return _cache["map"]
+
+
+def sites_for_device(device_id):
+    """Sites served by a kiosk; [] for unknown devices (match against the whole gallery)."""
+    if not device_id:
+        return []
+    return _device_map().get(device_id, [])
+
+
+def set_device_sites(device_id, sites):
+    """Replace the sites mapped to one device."""
+    DeviceSite.objects.filter(device_id=device_id).delete()
+    DeviceSite.objects.bulk_create([DeviceSite(device_id=device_id, site=site) for site in sites])
+    invalidate()
+
+
+def invalidate():
+    with _lock:
+        _cache["map"] = None
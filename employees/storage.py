@@ -0,0 +1,150 @@
+import calendar
+import hashlib
+import re
+
+from bson import ObjectId
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from employees.mongo import global_db, global_fs, hr_db, hr_fs
+
+# Employee images are stored in HR GridFS by register_employee and in Global
+# GridFS by the Global profile service; HR wins when both have the same md5.
+IMAGE_DATABASES = (("hr", hr_db), ("global", global_db))
+IMAGE_FS = {"hr": hr_fs, "global": global_fs}
+
+# GridFS files are immutable by ObjectId, so clients may cache them for a year.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+STREAM_CHUNK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_FILE_FIELDS = {"md5": 1, "length": 1, "contentType": 1, "uploadDate": 1, "filename": 1}
+
+
+def find_images_by_md5(md5s):
+    """
+    {md5: (database_label, fs.files document)} for every md5 found, using one
+    $in query per database instead of a find_one per employee.
+    """
+    found = {}
+    remaining = {m for m in md5s if m}
+    for label, get_db in IMAGE_DATABASES:
+        if not remaining:
+            break
+        for doc in get_db()["fs.files"].find({"md5": {"$in": list(remaining)}}, _FILE_FIELDS):
+            found.setdefault(doc["md5"], (label, doc))
+        remaining -= found.keys()
+    return found
+
+
+def open_image(label, file_id):
+    """GridOut for a file found by find_images_by_md5()."""
+    return IMAGE_FS[label]().get(file_id)
+
+
+def read_gridfs_file(fs, file_id):
+    """
+    Read a GridFS file chunk by chunk, hashing as it streams.
+    Returns (bytes, md5 hex digest). Raises gridfs.NoFile if it does not exist.
+    """
+    grid_out = fs.get(ObjectId(str(file_id)))
+    md5 = hashlib.md5()
+    parts = []
+    for chunk in grid_out:
+        md5.update(chunk)
+        parts.append(chunk)
+    return b"".join(parts), md5.hexdigest()
+
+
+def read_profile_image(file_id):
+    """Global profile image (the profileImage id of a backend_diagnostics_profile document)."""
+    return read_gridfs_file(global_fs(), file_id)
+
+
+def open_image_by_md5(md5):
+    """GridOut for the image with this md5 (HR first, then Global), or None."""
+    for label, _ in IMAGE_DATABASES:
+        file_obj = IMAGE_FS[label]().find_one({"md5": md5})
+        if file_obj:
+            return file_obj
+    return None
+
+
+def _byte_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, None when there is no
+    usable Range header (multiple ranges are served as the full file).
+    Raises ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def _iter_chunks(grid_out, start, length):
+    grid_out.seek(start)
+    remaining = length
+    while remaining > 0:
+        data = grid_out.read(min(STREAM_CHUNK_SIZE, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+
+
+def gridfs_response(request, grid_out, content_type=None, cache_control=IMMUTABLE_CACHE_CONTROL):
+    """
+    Stream a GridFS file with ETag/Last-Modified validators and single-range
+    support. Conditional requests (If-None-Match / If-Modified-Since) are
+    answered from the files document alone; no chunk is read for a 304.
+    """
+    etag = quote_etag(grid_out.md5 or str(grid_out._id))
+    last_modified = calendar.timegm(grid_out.upload_date.utctimetuple()) if grid_out.upload_date else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        size = grid_out.length
+        range_header = request.META.get("HTTP_RANGE")
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if if_range and if_range != etag:
+            range_header = None  # the client's partial copy is stale; send everything
+
+        try:
+            byte_range = _byte_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        content_type = content_type or grid_out.content_type or "application/octet-stream"
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _iter_chunks(grid_out, start, end - start + 1), status=206, content_type=content_type
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+        else:
+            response = StreamingHttpResponse(_iter_chunks(grid_out, 0, size), content_type=content_type)
+            response["Content-Length"] = str(size)
+        response["Accept-Ranges"] = "bytes"
+
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = cache_control
+    return response
@@ -0,0 +1,163 @@
+import atexit
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from bson import ObjectId
+from django.test import SimpleTestCase
+from pymongo.errors import BulkWriteError
+
+from employees import attendance_writer
+from employees.attendance_writer import AttendanceWriter, insert_documents, reserve_ids
+
+
+class FakeAttendanceCollection:
+    """insert_documents() stand-in with Mongo's _id uniqueness."""
+
+    def __init__(self):
+        self.docs = {}
+        self.fail = 0
+
+    def insert(self, docs):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("mongo unavailable")
+        new = [doc for doc in docs if doc["_id"] not in self.docs]
+        for doc in new:
+            self.docs[doc["_id"]] = doc
+        return len(new)
+
+
+class AttendanceWriterTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.collection = FakeAttendanceCollection()
+        patcher = mock.patch.object(attendance_writer, "insert_documents", side_effect=self.collection.insert)
+        self.insert = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _writer(self):
+        writer = AttendanceWriter(self.directory, flush_size=1000, flush_seconds=3600)
+        writer._run = lambda: None  # flushes are driven by the test
+        self.addCleanup(atexit.unregister, writer.flush)
+        return writer
+
+    def _segments(self):
+        return sorted(os.listdir(self.directory))
+
+    def _punch(self, employee_id):
+        return {"_id": ObjectId(), "employee_id": employee_id, "attendence_type": "IN"}
+
+    def test_append_journals_and_buffers_until_flush(self):
+        writer = self._writer()
+        docs = [self._punch(f"E{i}") for i in range(3)]
+        for doc in docs:
+            writer.append(doc)
+
+        self.insert.assert_not_called()
+        self.assertEqual(len(self._segments()), 1)
+        self.assertEqual(attendance_writer._read_journal(writer._path), docs)
+
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(list(self.collection.docs), [doc["_id"] for doc in docs])
+        # The flushed segment is gone; only the fresh, empty one remains
+        self.assertEqual(self._segments(), [os.path.basename(writer._path)])
+        self.assertEqual(writer.flush(), 0)
+
+    def test_failed_flush_keeps_documents_and_segments_for_the_retry(self):
+        writer = self._writer()
+        first, second = self._punch("E1"), self._punch("E2")
+        writer.append(first)
+        self.collection.fail = 1
+        self.assertEqual(writer.flush(), 0)
+        self.assertEqual(self.collection.docs, {})
+
+        writer.append(second)
+        self.assertEqual(len(self._segments()), 2)
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(list(self.collection.docs), [first["_id"], second["_id"]])
+        self.assertEqual(len(self._segments()), 1)
+
+    def test_segments_of_a_dead_writer_are_claimed_and_replayed(self):
+        dead = self._writer()
+        docs = [self._punch(f"E{i}") for i in range(4)]
+        for doc in docs:
+            dead.append(doc)
+        # Killed mid-buffer: nothing was inserted, the journal is all that is left
+        dead._file.close()
+
+        survivor = self._writer()
+        survivor.start()
+        self.assertEqual(survivor.replay_orphans(), 4)
+        self.assertEqual(list(self.collection.docs), [doc["_id"] for doc in docs])
+        self.assertEqual(self._segments(), [os.path.basename(survivor._path)])
+
+    def test_replay_skips_documents_inserted_before_the_crash(self):
+        dead = self._writer()
+        docs = [self._punch(f"E{i}") for i in range(3)]
+        for doc in docs:
+            dead.append(doc)
+        # The insert went through but the process died before deleting its segment
+        self.collection.insert(docs[:2])
+        dead._file.close()
+
+        survivor = self._writer()
+        survivor.start()
+        self.assertEqual(survivor.replay_orphans(), 1)
+        self.assertEqual(len(self.collection.docs), 3)
+
+    def test_torn_last_line_is_ignored(self):
+        writer = self._writer()
+        doc = self._punch("E1")
+        writer.append(doc)
+        with open(writer._path, "ab") as f:
+            f.write(b'{"_id": {"$oid": ')
+        self.assertEqual(attendance_writer._read_journal(writer._path), [doc])
+
+
+class InsertDocumentsTests(SimpleTestCase):
+    def setUp(self):
+        self.db = mock.MagicMock()
+        patcher = mock.patch.object(attendance_writer, "hr_db", return_value=self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.schema = self.db.__getitem__.return_value
+        self.attendance = self.schema
+
+    def test_reserve_ids_returns_the_first_id_of_the_block(self):
+        self.schema.find_one_and_update.return_value = {"auto": {"seq": 110}}
+        self.assertEqual(reserve_ids(10), 101)
+        _, update = self.schema.find_one_and_update.call_args[0]
+        self.assertEqual(update, {"$inc": {"auto.seq": 10}})
+
+    def test_reserve_ids_without_a_counter(self):
+        self.schema.find_one_and_update.return_value = None
+        with self.assertRaises(RuntimeError):
+            reserve_ids(1)
+
+    def test_missing_ids_are_reserved_in_one_block(self):
+        self.schema.find_one_and_update.return_value = {"auto": {"seq": 52}}
+        self.attendance.insert_many.return_value.inserted_ids = [1, 2, 3]
+        docs = [{"_id": 1, "attendence_id": 7}, {"_id": 2}, {"_id": 3}]
+        self.assertEqual(insert_documents(docs), 3)
+        self.assertEqual([doc["attendence_id"] for doc in docs], [7, 51, 52])
+        self.schema.find_one_and_update.assert_called_once()
+
+    def test_duplicate_ids_on_replay_are_skipped(self):
+        self.attendance.insert_many.side_effect = BulkWriteError(
+            {"writeErrors": [{"code": attendance_writer.DUPLICATE_KEY}], "nInserted": 2})
+        docs = [{"_id": i, "attendence_id": i} for i in range(3)]
+        self.assertEqual(insert_documents(docs), 2)
+        self.assertFalse(self.attendance.insert_many.call_args[1]["ordered"])
+
+    def test_other_write_errors_are_raised(self):
+        self.attendance.insert_many.side_effect = BulkWriteError(
+            {"writeErrors": [{"code": attendance_writer.DUPLICATE_KEY}, {"code": 121}], "nInserted": 0})
+        with self.assertRaises(BulkWriteError):
+            insert_documents([{"_id": 1, "attendence_id": 1}, {"_id": 2, "attendence_id": 2}])
+
+    def test_nothing_to_insert(self):
+        self.assertEqual(insert_documents([]), 0)
+        self.db.__getitem__.assert_not_called()
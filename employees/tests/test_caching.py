@@ -0,0 +1,123 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from employees import caching, debounce
+from employees.caching import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ClockTestCase(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(caching, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TTLCacheTests(ClockTestCase):
+    def test_entries_expire_after_ttl(self):
+        cache = TTLCache(ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=30)
+        self.clock.now += 9.9
+        self.assertEqual(cache.get("a"), 1)
+        self.clock.now += 0.1
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("a", "gone"), "gone")
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(ttl=10, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_delete_and_clear(self):
+        cache = TTLCache(ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.delete("a")
+        cache.delete("missing")
+        self.assertIsNone(cache.get("a"))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_add_only_sets_absent_or_expired_keys(self):
+        cache = TTLCache(ttl=10)
+        self.assertTrue(cache.add("a", 1))
+        self.assertFalse(cache.add("a", 2))
+        self.assertEqual(cache.get("a"), 1)
+        self.clock.now += 10
+        self.assertTrue(cache.add("a", 3))
+        self.assertEqual(cache.get("a"), 3)
+
+
+class DebounceTests(ClockTestCase):
+    def setUp(self):
+        super().setUp()
+        patchers = [
+            mock.patch.object(debounce, "time", self.clock),
+            mock.patch.multiple(debounce, DEBOUNCE_SECONDS=60, DEBOUNCE_CACHE_ALIAS="", _recent=TTLCache(60)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_repeat_punch_inside_the_window_returns_the_first(self):
+        punch = {"employee": "E1", "mode": "IN", "timestamp": "09:00"}
+        self.assertIsNone(debounce.recent_punch("E1", "IN"))
+        debounce.remember_punch("E1", "IN", punch)
+
+        self.clock.now += 59
+        self.assertEqual(debounce.recent_punch("E1", "IN"), punch)
+        self.assertIsNone(debounce.recent_punch("E1", "OUT"))
+        self.assertIsNone(debounce.recent_punch("E2", "IN"))
+        self.clock.now += 1
+        self.assertIsNone(debounce.recent_punch("E1", "IN"))
+
+    def test_disabled_window(self):
+        with mock.patch.object(debounce, "DEBOUNCE_SECONDS", 0):
+            debounce.remember_punch("E1", "IN", {"employee": "E1"})
+            self.assertIsNone(debounce.recent_punch("E1", "IN"))
+
+    def test_concurrent_taps_record_one_punch(self):
+        punch = {"employee": "E1", "mode": "IN", "timestamp": "09:00"}
+        self.assertIsNone(debounce.claim_punch("E1", "IN"))
+        self.assertIsNone(debounce.recent_punch("E1", "IN"))
+        self.assertIs(debounce.claim_punch("E1", "IN", wait=1), debounce.IN_PROGRESS)
+
+        debounce.remember_punch("E1", "IN", punch)
+        self.assertEqual(debounce.claim_punch("E1", "IN"), punch)
+        self.assertIsNone(debounce.claim_punch("E1", "OUT"))
+
+    def test_failed_insert_releases_the_claim(self):
+        debounce.claim_punch("E1", "IN")
+        debounce.release_punch("E1", "IN")
+        self.assertIsNone(debounce.claim_punch("E1", "IN", wait=0))
+
+    def test_shared_cache_reservation(self):
+        shared = mock.Mock()
+        shared.add.return_value = False
+        shared.get.return_value = (self.clock.now + 60, debounce.PENDING)
+        with mock.patch.object(debounce, "DEBOUNCE_CACHE_ALIAS", "shared"), \
+                mock.patch.object(debounce, "caches", {"shared": shared}):
+            # Another worker holds the claim: wait, then give up without keeping a local reservation
+            self.assertIs(debounce.claim_punch("E1", "IN", wait=0.1), debounce.IN_PROGRESS)
+            self.assertEqual(len(debounce._recent), 0)
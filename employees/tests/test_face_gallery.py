@@ -0,0 +1,128 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from employees.face_gallery import FaceGallery
+from employees.fields import ENCODING_DIM
+
+
+def _identities(n, seed=0):
+    # face_recognition encodings are roughly N(0, 0.09) per dimension
+    return np.random.default_rng(seed).normal(0.0, 0.09, (n, ENCODING_DIM)).astype(np.float32)
+
+
+class FaceGalleryTests(SimpleTestCase):
+    def _gallery(self, history=None, **kwargs):
+        """An in-memory gallery: loaded and never refreshed, with a fixed encoding history."""
+        kwargs.setdefault("templates", 3)
+        gallery = FaceGallery(refresh_seconds=0, ann_enabled=False, **kwargs)
+        gallery._clear()
+        gallery._loaded = True
+        history = history or {}
+        gallery._history = lambda ids=None: {
+            i: history[i][:gallery.templates - 1] for i in (ids or history) if i in history and gallery.templates > 1
+        }
+        return gallery
+
+    def _assert_consistent(self, gallery):
+        """Row and owner arrays agree after any sequence of updates."""
+        self.assertEqual(len(gallery._rows_of), gallery._n_owners)
+        self.assertEqual(sum(len(rows) for rows in gallery._rows_of), gallery._size)
+        for slot, rows in enumerate(gallery._rows_of):
+            self.assertEqual(gallery._slot_of[gallery._ids[slot]], slot)
+            self.assertTrue(all(gallery._owner[row] == slot for row in rows))
+            for row in rows:
+                np.testing.assert_allclose(
+                    gallery._sq_norms[row], gallery._matrix[row] @ gallery._matrix[row], rtol=1e-5)
+
+    def test_matches_each_employee_by_its_current_encoding(self):
+        faces = _identities(20)
+        gallery = self._gallery()
+        for i, face in enumerate(faces):
+            gallery.upsert(f"E{i}", f"Name {i}", face)
+
+        self.assertEqual(len(gallery), 20)
+        for i, face in enumerate(faces):
+            match = gallery.match(face + 0.01)
+            self.assertTrue(match.is_match)
+            self.assertEqual((match.employee_id, match.name), (f"E{i}", f"Name {i}"))
+        self.assertFalse(gallery.match(_identities(1, seed=99)[0]).is_match)
+
+    def test_history_templates_match_older_appearances(self):
+        current, older = _identities(2)
+        gallery = self._gallery(history={"E1": [older]})
+        gallery.upsert("E1", "Asha", current)
+
+        self.assertEqual(gallery._size, 2)
+        match = gallery.match(older)
+        self.assertEqual(match.employee_id, "E1")
+        self.assertAlmostEqual(match.distance, 0.0, places=5)
+
+        single = self._gallery(history={"E1": [older]}, templates=1)
+        single.upsert("E1", "Asha", current)
+        self.assertEqual(single._size, 1)
+
+    def test_remove_compacts_rows_and_owners(self):
+        faces = _identities(6, seed=1)
+        history = {f"E{i}": [faces[i] + 0.02] for i in range(6)}
+        gallery = self._gallery(history=history)
+        for i, face in enumerate(faces):
+            gallery.upsert(f"E{i}", f"Name {i}", face)
+
+        gallery.remove("E1")
+        gallery.remove("E4")
+        gallery.remove("missing")
+        self._assert_consistent(gallery)
+        self.assertEqual((gallery._n_owners, gallery._size), (4, 8))
+        self.assertNotEqual(gallery.match(faces[1]).employee_id, "E1")
+        for i in (0, 2, 3, 5):
+            self.assertEqual(gallery.match(faces[i]).employee_id, f"E{i}")
+
+    def test_upsert_replaces_and_deactivates(self):
+        first, second, other = _identities(3, seed=2)
+        gallery = self._gallery()
+        gallery.upsert("E1", "Asha", first)
+        gallery.upsert("E2", "Ravi", other)
+
+        gallery.upsert("E1", "Asha K", second)
+        self._assert_consistent(gallery)
+        self.assertEqual(gallery._size, 2)
+        match = gallery.match(second)
+        self.assertEqual((match.employee_id, match.name), ("E1", "Asha K"))
+        self.assertNotEqual(gallery.match(first).employee_id, "E1")
+
+        gallery.upsert("E1", "Asha K", second, is_active=False)
+        self._assert_consistent(gallery)
+        self.assertEqual(len(gallery), 1)
+        self.assertEqual(gallery.match(other).employee_id, "E2")
+
+    def test_site_restricted_match_and_fallback(self):
+        north, south, unassigned = _identities(3, seed=3)
+        gallery = self._gallery()
+        gallery.upsert("N", "North", north, site="north")
+        gallery.upsert("S", "South", south, site="south")
+        gallery.upsert("U", "Unassigned", unassigned)
+
+        self.assertEqual(gallery.match(north, sites=["north"], fallback=False).employee_id, "N")
+        self.assertEqual(gallery.match(unassigned, sites=["north"], fallback=False).employee_id, "U")
+        self.assertFalse(gallery.match(south, sites=["north"], fallback=False).is_match)
+        self.assertEqual(gallery.match(south, sites=["north"], fallback=True).employee_id, "S")
+
+        gallery.remove("N")
+        self.assertEqual(gallery.match(unassigned, sites=["north"], fallback=False).employee_id, "U")
+
+    def test_ann_search_agrees_with_exact_search(self):
+        faces = _identities(400, seed=4)
+        exact = self._gallery(templates=1)
+        ann = self._gallery(templates=1, ann_min_size=64)
+        ann.ann_enabled = True
+        for gallery in (exact, ann):
+            for i, face in enumerate(faces):
+                gallery.upsert(f"E{i}", f"Name {i}", face)
+
+        ann.remove("E7")
+        exact.remove("E7")
+        self._assert_consistent(ann)
+        agree = sum(
+            ann.match(face + 0.01).employee_id == exact.match(face + 0.01).employee_id for face in faces
+        )
+        self.assertGreaterEqual(agree / len(faces), 0.95)
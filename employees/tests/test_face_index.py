@@ -0,0 +1,70 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from employees.face_index import IVFIndex, exact_search, owner_search
+
+
+def _clustered(n, dim=128, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0.0, 0.09, (clusters, dim))
+    return (centers[rng.integers(0, clusters, n)] + rng.normal(0.0, 0.03, (n, dim))).astype(np.float32)
+
+
+class OwnerSearchTests(SimpleTestCase):
+    def test_matches_a_per_owner_python_loop(self):
+        rng = np.random.default_rng(1)
+        matrix = rng.normal(0.0, 0.09, (60, 128)).astype(np.float32)
+        sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+        owners = rng.integers(0, 20, 60)
+        probe = rng.normal(0.0, 0.09, 128).astype(np.float32)
+
+        best = {}
+        for row, owner in enumerate(owners):
+            dist = float(np.sum((matrix[row] - probe) ** 2))
+            best[owner] = min(best.get(owner, np.inf), dist)
+        expected = min(best, key=best.get)
+
+        owner, sq_dist = owner_search(probe, matrix, sq_norms, owners, 20)
+        self.assertEqual(owner, expected)
+        self.assertAlmostEqual(sq_dist, best[expected], places=4)
+
+        subset = np.flatnonzero(owners != expected)
+        self.assertNotEqual(owner_search(probe, matrix, sq_norms, owners, 20, subset)[0], expected)
+        self.assertEqual(owner_search(probe, matrix, sq_norms, owners, 20, subset[:0]), (-1, float("inf")))
+
+
+class IVFIndexTests(SimpleTestCase):
+    def test_recall_against_brute_force(self):
+        matrix = _clustered(5000)
+        sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+        probes = matrix[np.random.default_rng(2).choice(5000, 200, replace=False)] + 0.01
+
+        index = IVFIndex(nprobe=16)
+        index.build(matrix)
+        hits = sum(
+            index.search(probe, matrix, sq_norms)[0] == exact_search(probe, matrix, sq_norms)[0]
+            for probe in probes
+        )
+        self.assertGreaterEqual(hits / len(probes), 0.95)
+
+    def test_probing_every_list_is_exact(self):
+        matrix = _clustered(500, seed=3)
+        sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+        index = IVFIndex(nlist=8, nprobe=8)
+        index.build(matrix)
+        for probe in matrix[:20]:
+            self.assertEqual(index.search(probe, matrix, sq_norms)[0], exact_search(probe, matrix, sq_norms)[0])
+
+    def test_row_bookkeeping_follows_the_matrix(self):
+        matrix = _clustered(300, seed=4)
+        index = IVFIndex(nlist=4, nprobe=4)
+        index.build(matrix[:200])
+
+        for row in range(200, 300):
+            index.set_row(row, matrix[row])
+        self.assertEqual(sorted(index.candidates(matrix[0])), list(range(300)))
+
+        # Remove row 10 the way FaceGallery does: move the last row into the hole
+        index.move_row(299, 10)
+        index.truncate(299)
+        self.assertEqual(sorted(index.candidates(matrix[0])), list(range(299)))
@@ -0,0 +1,60 @@
+from io import BytesIO
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+
+from employees.face_utils import decode_image
+
+
+def _image_bytes(size, fmt="JPEG"):
+    width, height = size
+    # Left half red, right half blue: shows whether the decode kept the layout
+    img = Image.new("RGB", size, (255, 0, 0))
+    img.paste((0, 0, 255), (width // 2, 0, width, height))
+    buffer = BytesIO()
+    img.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class DecodeImageTests(SimpleTestCase):
+    def test_large_jpeg_is_decoded_in_draft_mode(self):
+        data = _image_bytes((4000, 3000))
+        with mock.patch.object(JpegImageFile, "draft", autospec=True, side_effect=JpegImageFile.draft) as draft:
+            img = decode_image(data, max_dim=1024)
+        draft.assert_called_once_with(mock.ANY, "RGB", (1024, 1024))
+        self.assertEqual(img.shape, (768, 1024, 3))
+        self.assertEqual(img.dtype, np.uint8)
+
+    def test_orientation_and_layout_are_kept(self):
+        portrait = decode_image(_image_bytes((3000, 4000)), max_dim=1024)
+        self.assertEqual(portrait.shape, (1024, 768, 3))
+        landscape = decode_image(_image_bytes((4000, 3000)), max_dim=1024)
+        self.assertEqual(landscape.shape, (768, 1024, 3))
+        # Red stays on the left, blue on the right
+        self.assertGreater(landscape[384, 100, 0], 200)
+        self.assertGreater(landscape[384, 900, 2], 200)
+
+    def test_small_images_are_not_resized(self):
+        data = _image_bytes((640, 480))
+        with mock.patch.object(JpegImageFile, "draft", autospec=True) as draft:
+            img = decode_image(data, max_dim=1024)
+        draft.assert_not_called()
+        self.assertEqual(img.shape, (480, 640, 3))
+
+    def test_non_jpeg_is_downscaled_after_decode(self):
+        img = decode_image(_image_bytes((2048, 1024), "PNG"), max_dim=1024)
+        self.assertEqual(img.shape, (512, 1024, 3))
+
+    def test_accepts_buffers_and_rewinds_file_objects(self):
+        data = _image_bytes((800, 600))
+        upload = BytesIO(data)
+        upload.read()
+        for source in (data, memoryview(data), bytearray(data), upload):
+            with self.subTest(source=type(source).__name__):
+                self.assertEqual(decode_image(source, max_dim=1024).shape, (600, 800, 3))
+
+    def test_max_dim_zero_decodes_at_native_resolution(self):
+        self.assertEqual(decode_image(_image_bytes((2000, 1500)), max_dim=0).shape, (1500, 2000, 3))
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+from bson import Binary
+from django.test import SimpleTestCase
+
+from employees.fields import ENCODING_DIM, pack_encoding, unpack_encoding
+
+
+def _encoding(seed):
+    return np.random.default_rng(seed).normal(0.0, 0.09, ENCODING_DIM).astype(np.float32)
+
+
+class EncodingCodecTests(SimpleTestCase):
+    def test_single_round_trip(self):
+        encoding = _encoding(0)
+        packed = pack_encoding(encoding)
+        self.assertIsInstance(packed, Binary)
+        self.assertEqual(len(packed), ENCODING_DIM * 4)
+        np.testing.assert_array_equal(unpack_encoding(packed), encoding)
+
+    def test_multiple_round_trip(self):
+        stack = np.stack([_encoding(1), _encoding(2), _encoding(3)])
+        unpacked = unpack_encoding(pack_encoding(stack), multiple=True)
+        self.assertEqual(unpacked.shape, (3, ENCODING_DIM))
+        np.testing.assert_array_equal(unpacked, stack)
+
+    def test_legacy_list_and_strings(self):
+        encoding = _encoding(4)
+        for legacy in (encoding.tolist(), json.dumps(encoding.tolist()), repr(encoding.tolist())):
+            np.testing.assert_allclose(unpack_encoding(legacy), encoding)
+
+    def test_mixed_legacy_history_skips_malformed_entries(self):
+        first, second, third = _encoding(5), _encoding(6), _encoding(7)
+        history = [
+            json.dumps(first.tolist()),
+            second.tolist(),
+            "[0.1, 0.2",
+            [0.1, 0.2],
+            bytes(pack_encoding(third)),
+        ]
+        unpacked = unpack_encoding(history, multiple=True)
+        self.assertEqual(unpacked.shape, (3, ENCODING_DIM))
+        np.testing.assert_allclose(unpacked, np.stack([first, second, third]))
+
+    def test_empty_values(self):
+        self.assertIsNone(unpack_encoding(None))
+        self.assertIsNone(unpack_encoding([]))
+        self.assertIsNone(unpack_encoding(b""))
+        self.assertIsNone(pack_encoding(None))
+        self.assertIsNone(unpack_encoding(["not an encoding"], multiple=True))
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from employees import caching, idempotency
+from employees.caching import TTLCache
+
+
+class IdempotencyTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = mock.Mock(monotonic=mock.Mock(return_value=1000.0))
+        self.clock.sleep.side_effect = self._advance
+        patchers = [
+            mock.patch.object(caching, "time", self.clock),
+            mock.patch.object(idempotency, "time", self.clock),
+            mock.patch.multiple(
+                idempotency, IDEMPOTENCY_TTL=30, IDEMPOTENCY_CACHE_ALIAS="", _results=TTLCache(30)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _advance(self, seconds):
+        self.clock.monotonic.return_value += seconds
+
+    def test_request_key(self):
+        self.assertEqual(idempotency.request_key("abc", b"image", "kiosk-1", "IN"), "mark:kiosk-1:IN:key:abc")
+        by_image = idempotency.request_key(None, b"image", "kiosk-1", "IN")
+        self.assertTrue(by_image.startswith("mark:kiosk-1:IN:md5:"))
+        self.assertNotEqual(by_image, idempotency.request_key(None, b"image", "kiosk-1", "OUT"))
+        self.assertNotEqual(by_image, idempotency.request_key(None, b"other", "kiosk-1", "IN"))
+
+    def test_result_is_replayed_until_the_ttl(self):
+        body = {"employee": "E1", "mode": "IN"}
+        idempotency.remember_result("k", 201, body)
+        self._advance(29)
+        self.assertEqual(idempotency.cached_result("k"), (201, body))
+        self._advance(1)
+        self.assertIsNone(idempotency.cached_result("k"))
+
+    def test_only_final_answers_are_cached(self):
+        for status in (500, 503):
+            idempotency.remember_result(f"k{status}", status, {"error": "busy"})
+            self.assertIsNone(idempotency.cached_result(f"k{status}"))
+        idempotency.remember_result("k404", 404, {"error": "User Not Found"})
+        self.assertEqual(idempotency.cached_result("k404"), (404, {"error": "User Not Found"}))
+
+    def test_first_claim_owns_the_key(self):
+        self.assertIsNone(idempotency.claim("k"))
+        self.assertIsNone(idempotency.cached_result("k"))
+
+    def test_concurrent_claim_gets_the_result_once_it_lands(self):
+        idempotency.claim("k")
+
+        def finish(seconds):
+            self._advance(seconds)
+            idempotency.remember_result("k", 201, {"employee": "E1"})
+
+        self.clock.sleep.side_effect = finish
+        self.assertEqual(idempotency.claim("k", wait=5), (201, {"employee": "E1"}))
+
+    def test_concurrent_claim_gives_up_after_the_wait(self):
+        idempotency.claim("k")
+        self.assertIs(idempotency.claim("k", wait=5), idempotency.IN_PROGRESS)
+
+    def test_failed_request_frees_the_key(self):
+        idempotency.claim("k503")
+        idempotency.remember_result("k503", 503, {"error": "busy"})
+        self.assertIsNone(idempotency.claim("k503", wait=0))
+
+        idempotency.claim("kboom")
+        idempotency.release("kboom")
+        self.assertIsNone(idempotency.claim("kboom", wait=0))
@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from employees import idempotency, inference
+from employees.caching import TTLCache
+from employees.inference import InferenceBusyError
+
+
+class FakePool:
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.futures = []
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("worker died")
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+class PoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = FakePool()
+        self.slots = threading.BoundedSemaphore(1)
+        patchers = [
+            mock.patch.object(inference, "_get_pool", lambda: (self.pool, self.slots)),
+            mock.patch.multiple(inference, INFERENCE_QUEUE_TIMEOUT=0.01, INFERENCE_TIMEOUT=0.01),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_saturated_pool_refuses_new_work(self):
+        future = inference._submit(inference._ping)
+        with self.assertRaisesMessage(InferenceBusyError, "saturated"):
+            inference._submit(inference._ping)
+
+        # The slot comes back when the running request finishes
+        future.set_result(1)
+        inference._submit(inference._ping)
+
+    def test_slow_inference_times_out_and_is_cancelled(self):
+        with self.assertRaisesMessage(InferenceBusyError, "timed out"):
+            inference._run(inference._ping)
+        self.assertTrue(self.pool.futures[0].cancelled())
+        self.assertTrue(self.slots.acquire(blocking=False))
+
+    def test_broken_pool_is_reset(self):
+        self.pool.broken = True
+        with mock.patch.object(inference, "_reset_pool") as reset_pool:
+            with self.assertRaisesMessage(InferenceBusyError, "restarted"):
+                inference._run(inference._ping)
+        reset_pool.assert_called_once_with()
+        self.assertTrue(self.slots.acquire(blocking=False))
+
+
+class BusyViewTests(SimpleTestCase):
+    def setUp(self):
+        patchers = [
+            mock.patch("pyauth.auth.HasRolePermission.has_permission", return_value=True),
+            mock.patch("employees.views.attendance.encode_image", side_effect=InferenceBusyError("saturated")),
+            mock.patch.multiple(
+                idempotency, IDEMPOTENCY_TTL=30, IDEMPOTENCY_CACHE_ALIAS="", _results=TTLCache(30)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_busy_pool_answers_503_and_the_retry_runs_again(self):
+        data = {'image': 'aGVsbG8=', 'auth-user-id': 'kiosk-1', 'mode': 'IN'}
+        for _ in range(2):
+            response = self.client.post('/_b_a_c_k_e_n_d/HR/mark/', data, HTTP_IDEMPOTENCY_KEY='k1')
+            self.assertEqual(response.status_code, 503)
+            self.assertNotIn('Idempotent-Replayed', response)
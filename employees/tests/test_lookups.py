@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from employees import lookups
+
+
+class EmployeeDirectoryTests(SimpleTestCase):
+    def setUp(self):
+        lookups._directory.update(sources=None, value=None)
+        self.addCleanup(lookups._directory.update, sources=None, value=None)
+
+    def _directory(self, departments, designations, profiles):
+        with mock.patch.object(lookups, "department_map", return_value=departments), \
+                mock.patch.object(lookups, "designation_map", return_value=designations), \
+                mock.patch.object(lookups, "global_profiles", return_value=profiles):
+            return lookups.employee_directory()
+
+    def test_resolves_codes_and_reuses_the_result_while_sources_are_unchanged(self):
+        departments, designations = {"D1": "Finance"}, {"G1": "Analyst"}
+        profiles = [{"employeeId": "E1", "employeeName": "Asha", "department": "D1", "designation": "G1"}]
+
+        first = self._directory(departments, designations, profiles)
+        self.assertEqual(first, {"E1": {"employeeName": "Asha", "department": "Finance", "designation": "Analyst"}})
+        self.assertIs(self._directory(departments, designations, profiles), first)
+
+    def test_rebuilt_source_rebuilds_the_directory_even_if_equal(self):
+        departments, designations = {"D1": "Finance"}, {}
+        profiles = [{"employeeId": "E1", "employeeName": "Asha", "department": "D1"}]
+        first = self._directory(departments, designations, profiles)
+
+        departments = {"D1": "Accounts"}
+        self.assertEqual(self._directory(departments, designations, profiles)["E1"]["department"], "Accounts")
+        self.assertIsNot(self._directory(dict(departments), designations, profiles), first)
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from employees import metrics
+from employees.metrics import Registry
+
+
+class RenderTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(metrics, "METRICS_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry = Registry()
+
+    def test_counter_exposition(self):
+        hits = self.registry.counter("hits_total", "Cache hits.", ["cache"])
+        hits.inc(cache="debounce")
+        hits.inc(2, cache="idempotency")
+        hits.inc(cache="debounce")
+        self.assertEqual(self.registry.render(), (
+            "# HELP hits_total Cache hits.\n"
+            "# TYPE hits_total counter\n"
+            'hits_total{cache="debounce"} 2.0\n'
+            'hits_total{cache="idempotency"} 2.0\n'
+        ))
+
+    def test_histogram_buckets_are_cumulative(self):
+        seconds = self.registry.histogram("stage_seconds", "Stage time.", ["stage"], buckets=(0.1, 1.0))
+        seconds.observe(0.05, stage="match")
+        seconds.observe(0.1, stage="match")
+        seconds.observe(0.5, stage="match")
+        seconds.observe(3, stage="match")
+        self.assertEqual(self.registry.render().splitlines(), [
+            "# HELP stage_seconds Stage time.",
+            "# TYPE stage_seconds histogram",
+            'stage_seconds_bucket{stage="match",le="0.1"} 2',
+            'stage_seconds_bucket{stage="match",le="1.0"} 3',
+            'stage_seconds_bucket{stage="match",le="+Inf"} 4',
+            'stage_seconds_sum{stage="match"} 3.65',
+            'stage_seconds_count{stage="match"} 4',
+        ])
+
+    def test_label_values_are_escaped(self):
+        errors = self.registry.counter("errors_total", "Errors.", ["endpoint"])
+        errors.inc(endpoint='a"b\\c\nd')
+        self.assertIn('errors_total{endpoint="a\\"b\\\\c\\nd"} 1.0', self.registry.render())
+
+    def test_disabled_metrics_record_nothing(self):
+        hits = self.registry.counter("hits_total", "Cache hits.")
+        with mock.patch.object(metrics, "METRICS_ENABLED", False):
+            hits.inc()
+        self.assertEqual(self.registry.render(), "# HELP hits_total Cache hits.\n# TYPE hits_total counter\n")
@@ -0,0 +1,27 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from employees import metrics
+
+METRICS_PATH = '/_b_a_c_k_e_n_d/HR/metrics/'
+
+
+class MetricsViewTests(SimpleTestCase):
+    def test_disabled_without_a_token(self):
+        with mock.patch.object(metrics, "METRICS_TOKEN", ""):
+            response = self.client.get(METRICS_PATH, HTTP_AUTHORIZATION="Bearer anything")
+        self.assertEqual(response.status_code, 404)
+
+    def test_missing_or_wrong_token_is_rejected(self):
+        with mock.patch.object(metrics, "METRICS_TOKEN", "s3cret"):
+            for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer wrong"}, {"HTTP_AUTHORIZATION": "s3cret"}):
+                with self.subTest(headers=headers):
+                    self.assertEqual(self.client.get(METRICS_PATH, **headers).status_code, 401)
+
+    def test_scrape_with_the_token(self):
+        with mock.patch.object(metrics, "METRICS_TOKEN", "s3cret"):
+            response = self.client.get(METRICS_PATH, HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(b"# TYPE http_requests_total counter", response.content)
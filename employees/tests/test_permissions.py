@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from employees.auth.permissions_map import PAGE_MAPPING
+
+ASYNC_MARK_PATHS = ('/_b_a_c_k_e_n_d/HR/async/mark/', '/async/mark/')
+INVALIDATE_PATHS = ('/_b_a_c_k_e_n_d/HR/lookups/invalidate/', '/lookups/invalidate/')
+
+
+class AsyncMarkPermissionTests(SimpleTestCase):
+    def test_async_routes_share_the_mark_page_code(self):
+        for path in ASYNC_MARK_PATHS:
+            self.assertEqual(PAGE_MAPPING[path], PAGE_MAPPING['/_b_a_c_k_e_n_d/HR/mark/'])
+
+    def test_caller_without_the_mark_role_is_rejected_on_both_mounts(self):
+        for path in ASYNC_MARK_PATHS:
+            with self.subTest(path=path):
+                response = self.client.post(path, {'auth-user-id': 'kiosk-1', 'mode': 'IN'})
+                self.assertEqual(response.status_code, 403)
+
+
+class InvalidateLookupsPermissionTests(SimpleTestCase):
+    def test_both_mounts_need_the_admin_page_code(self):
+        for path in INVALIDATE_PATHS:
+            self.assertEqual(PAGE_MAPPING[path], 'FR-API-ADMIN')
+
+    def test_anonymous_caller_cannot_invalidate(self):
+        for path in INVALIDATE_PATHS:
+            with self.subTest(path=path):
+                with mock.patch('employees.lookups.invalidate_all') as invalidate_all:
+                    response = self.client.post(path)
+                self.assertEqual(response.status_code, 403)
+                invalidate_all.assert_not_called()
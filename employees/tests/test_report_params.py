@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+
+from employees import reports
+from employees.views.attendance import _report_params
+
+
+class ReportParamsTests(SimpleTestCase):
+    def _parse(self, query):
+        return _report_params(QueryDict(query))
+
+    def test_valid_range_and_page(self):
+        params, error = self._parse("from_date=2025-01-01&to_date=2025-02-01&limit=50")
+        self.assertIsNone(error)
+        self.assertEqual((params["from_date"], params["to_date"]), (datetime(2025, 1, 1), datetime(2025, 2, 1)))
+        self.assertEqual(params["limit"], 50)
+
+    def test_bad_input_is_a_400_error_not_an_exception(self):
+        for query in (
+            "from_date=2025-13-01&to_date=2025-02-01",
+            "from_date=yesterday&to_date=today",
+            "limit=abc",
+            "limit=0",
+            "cursor=not-a-cursor",
+            "engine=nope",
+        ):
+            with self.subTest(query=query):
+                params, error = self._parse(query)
+                self.assertIsNone(params)
+                self.assertTrue(error)
+
+    def test_limit_is_capped(self):
+        params, _ = self._parse(f"limit={reports.REPORT_MAX_PAGE_SIZE + 1}")
+        self.assertEqual(params["limit"], reports.REPORT_MAX_PAGE_SIZE)
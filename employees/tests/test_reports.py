@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+
+from django.test import SimpleTestCase
+
+from employees.reports import InvalidCursor, decode_cursor, encode_cursor
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        for when in (datetime(2025, 3, 1, 8, 30, 15, 123456), datetime(2025, 3, 1, 8, 30, tzinfo=timezone.utc)):
+            token = encode_cursor({"attendence_time": when, "attendence_id": 42})
+            self.assertEqual(decode_cursor(token), (when, 42))
+
+    def test_token_is_url_safe(self):
+        token = encode_cursor({"attendence_time": datetime(2025, 12, 31, 23, 59, 59), "attendence_id": 10 ** 12})
+        self.assertRegex(token, r"^[A-Za-z0-9_=-]+$")
+
+    def test_invalid_tokens(self):
+        # "", bad base64, "not json", {"t": 1}
+        for token in ("", "not-base64!", "bm90IGpzb24=", "eyJ0IjogMX0="):
+            with self.subTest(token=token):
+                with self.assertRaises(InvalidCursor):
+                    decode_cursor(token)
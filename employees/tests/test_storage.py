@@ -0,0 +1,107 @@
+import datetime
+from io import BytesIO
+from unittest import mock
+
+from bson import ObjectId
+from django.test import RequestFactory, SimpleTestCase
+
+from employees import storage
+from employees.storage import _byte_range, gridfs_response
+
+
+class ByteRangeTests(SimpleTestCase):
+    def test_no_usable_header(self):
+        for header in (None, "", "bytes=-", "items=0-10", "bytes=0-1,4-5"):
+            with self.subTest(header=header):
+                self.assertIsNone(_byte_range(header, 100))
+
+    def test_explicit_and_open_ranges(self):
+        self.assertEqual(_byte_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(_byte_range(" bytes=10-", 100), (10, 99))
+        self.assertEqual(_byte_range("bytes=90-500", 100), (90, 99))
+        self.assertEqual(_byte_range("bytes=99-99", 100), (99, 99))
+
+    def test_suffix_ranges(self):
+        self.assertEqual(_byte_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(_byte_range("bytes=-500", 100), (0, 99))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ("bytes=100-", "bytes=50-10", "bytes=-0"):
+            with self.subTest(header=header):
+                with self.assertRaises(ValueError):
+                    _byte_range(header, 100)
+
+
+class FakeGridOut(BytesIO):
+    def __init__(self, data, md5="abc123"):
+        super().__init__(data)
+        self.md5 = md5
+        self._id = ObjectId()
+        self.length = len(data)
+        self.content_type = "image/jpeg"
+        self.upload_date = datetime.datetime(2024, 1, 2, 3, 4, 5)
+
+
+class GridfsResponseTests(SimpleTestCase):
+    DATA = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.grid_out = FakeGridOut(self.DATA)
+
+    def _get(self, **headers):
+        return gridfs_response(self.factory.get("/image/", **headers), self.grid_out)
+
+    def test_full_response_has_validators(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.DATA)
+        self.assertEqual(response["ETag"], '"abc123"')
+        self.assertEqual(response["Last-Modified"], "Tue, 02 Jan 2024 03:04:05 GMT")
+        self.assertEqual(response["Content-Length"], str(len(self.DATA)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], storage.IMMUTABLE_CACHE_CONTROL)
+
+    def test_matching_etag_is_a_304_without_reading_chunks(self):
+        with mock.patch.object(storage, "_iter_chunks") as iter_chunks:
+            response = self._get(HTTP_IF_NONE_MATCH='"abc123"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], '"abc123"')
+        iter_chunks.assert_not_called()
+
+    def test_not_modified_since(self):
+        response = self._get(HTTP_IF_MODIFIED_SINCE="Wed, 03 Jan 2024 00:00:00 GMT")
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_single_range_is_a_206(self):
+        with mock.patch.object(storage, "STREAM_CHUNK_SIZE", 7):
+            response = self._get(HTTP_RANGE="bytes=10-29")
+            body = b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.DATA[10:30])
+        self.assertEqual(response["Content-Range"], f"bytes 10-29/{len(self.DATA)}")
+        self.assertEqual(response["Content-Length"], "20")
+
+    def test_stale_if_range_gets_the_full_file(self):
+        response = self._get(HTTP_RANGE="bytes=10-29", HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        response = self._get(HTTP_RANGE="bytes=10-29", HTTP_IF_RANGE='"abc123"')
+        self.assertEqual(response.status_code, 206)
+
+    def test_unsatisfiable_range_is_a_416(self):
+        response = self._get(HTTP_RANGE=f"bytes={len(self.DATA)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.DATA)}")
+
+
+class ImageLookupTests(SimpleTestCase):
+    def test_gridfs_handles_come_from_the_registry(self):
+        hr, glob = mock.Mock(), mock.Mock()
+        hr.find_one.return_value = None
+        with mock.patch.dict(storage.IMAGE_FS, {"hr": lambda: hr, "global": lambda: glob}):
+            self.assertIs(storage.open_image_by_md5("m1"), glob.find_one.return_value)
+            self.assertIs(storage.open_image("hr", 1), hr.get.return_value)
+        hr.find_one.assert_called_once_with({"md5": "m1"})
+        glob.find_one.assert_called_once_with({"md5": "m1"})
+        hr.get.assert_called_once_with(1)
@@ -0,0 +1,141 @@
+from io import BytesIO, StringIO
+from unittest import mock
+
+from bson import ObjectId
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from PIL import Image
+
+from employees import thumbnails
+from employees.management.commands import backfill_thumbnails
+from employees.thumbnails import DERIVATIVE_BUCKET, INLINE_PREVIEW_SIZE, find_derivative_contents
+
+
+def _jpeg(size):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 120, 80)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class MakeThumbnailTests(SimpleTestCase):
+    def test_longest_side_is_capped_and_aspect_kept(self):
+        thumb, content_type = thumbnails.make_thumbnail(_jpeg((2000, 1000)), size=256, fmt="JPEG")
+        self.assertEqual(content_type, "image/jpeg")
+        self.assertEqual(Image.open(BytesIO(thumb)).size, (256, 128))
+
+    def test_webp_output(self):
+        thumb, content_type = thumbnails.make_thumbnail(_jpeg((300, 600)), size=64, fmt="WEBP")
+        self.assertEqual(content_type, "image/webp")
+        img = Image.open(BytesIO(thumb))
+        self.assertEqual((img.format, img.size), ("WEBP", (32, 64)))
+
+    def test_sizes_snap_up_to_a_stored_size(self):
+        with mock.patch.object(thumbnails, "THUMBNAIL_SIZES", [64, 256]):
+            self.assertEqual(thumbnails.snap_size(10), 64)
+            self.assertEqual(thumbnails.snap_size(64), 64)
+            self.assertEqual(thumbnails.snap_size(100), 256)
+            self.assertEqual(thumbnails.snap_size(900), 256)
+
+
+class StoreDerivativesTests(SimpleTestCase):
+    def setUp(self):
+        self.files, self.bucket = mock.MagicMock(), mock.MagicMock()
+        patchers = [
+            mock.patch.object(thumbnails, "hr_db", return_value={f"{DERIVATIVE_BUCKET}.files": self.files}),
+            mock.patch.object(thumbnails, "derivative_bucket", return_value=self.bucket),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_only_missing_sizes_are_generated(self):
+        self.files.find.return_value = [{"size": 64}]
+        created = thumbnails.store_derivatives("m1", _jpeg((800, 600)), sizes=[64, 256], fmt="JPEG")
+        self.assertEqual(created, [256])
+        self.bucket.put.assert_called_once_with(
+            mock.ANY, image_md5="m1", size=256, format="JPEG", content_type="image/jpeg")
+        self.assertEqual(Image.open(BytesIO(self.bucket.put.call_args[0][0])).size, (256, 192))
+
+    def test_stored_derivative_is_served_without_touching_the_original(self):
+        stored = mock.Mock()
+        with mock.patch.object(thumbnails, "find_derivative", return_value=stored), \
+                mock.patch.object(thumbnails, "open_image_by_md5") as open_original:
+            self.assertIs(thumbnails.get_thumbnail("m1", 256, fmt="JPEG"), stored)
+        open_original.assert_not_called()
+
+    def test_missing_derivative_is_generated_from_the_original(self):
+        self.files.find.return_value = []
+        generated = mock.Mock()
+        with mock.patch.object(thumbnails, "find_derivative", side_effect=[None, generated]), \
+                mock.patch.object(thumbnails, "open_image_by_md5", return_value=BytesIO(_jpeg((800, 600)))):
+            self.assertIs(thumbnails.get_thumbnail("m1", 256, fmt="JPEG"), generated)
+        self.assertEqual(self.bucket.put.call_args[1]["size"], 256)
+
+    def test_unknown_image(self):
+        with mock.patch.object(thumbnails, "find_derivative", return_value=None), \
+                mock.patch.object(thumbnails, "open_image_by_md5", return_value=None):
+            self.assertIsNone(thumbnails.get_thumbnail("nope", 256))
+        self.bucket.put.assert_not_called()
+
+
+class BackfillThumbnailsTests(SimpleTestCase):
+    def test_only_incomplete_images_are_backfilled(self):
+        files = mock.MagicMock()
+        files.find.return_value = [
+            {"image_md5": "done", "size": 64}, {"image_md5": "done", "size": 256},
+            {"image_md5": "half", "size": 64},
+        ]
+        employees = mock.MagicMock()
+        employees.exclude.return_value.exclude.return_value.values_list.return_value = [
+            "done", "half", "new", "gone", "new"]
+        originals = {"half": ("hr", {"_id": 1}), "new": ("hr", {"_id": 2})}
+        stdout, stderr = StringIO(), StringIO()
+
+        with mock.patch.object(backfill_thumbnails, "THUMBNAIL_SIZES", [64, 256]), \
+                mock.patch.object(backfill_thumbnails, "hr_db", return_value={f"{DERIVATIVE_BUCKET}.files": files}), \
+                mock.patch.object(backfill_thumbnails.Employee, "objects", employees), \
+                mock.patch.object(backfill_thumbnails, "find_images_by_md5", return_value=originals) as find, \
+                mock.patch.object(backfill_thumbnails, "open_image", return_value=BytesIO(b"img")), \
+                mock.patch.object(backfill_thumbnails, "store_derivatives",
+                                  side_effect=lambda md5, data: [256] if md5 == "half" else [64, 256]) as store:
+            call_command("backfill_thumbnails", workers=2, batch_size=10, stdout=stdout, stderr=stderr)
+
+        find.assert_called_once_with(["gone", "half", "new"])
+        self.assertEqual(sorted(c[0][0] for c in store.call_args_list), ["half", "new"])
+        self.assertIn("Created 3 derivatives; 1 images already complete; 1 failed", stdout.getvalue())
+
+
+class FindDerivativeContentsTests(SimpleTestCase):
+    def setUp(self):
+        self.files, self.chunks = mock.MagicMock(), mock.MagicMock()
+        db = {f"{DERIVATIVE_BUCKET}.files": self.files, f"{DERIVATIVE_BUCKET}.chunks": self.chunks}
+        patcher = mock.patch.object(thumbnails, "hr_db", return_value=db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_whole_page_in_two_queries(self):
+        a, b = ObjectId(), ObjectId()
+        self.files.find.return_value.sort.return_value = [
+            {"_id": a, "image_md5": "m1", "contentType": "image/jpeg"},
+            {"_id": b, "image_md5": "m2", "contentType": "image/webp"},
+        ]
+        self.chunks.find.return_value.sort.return_value = [
+            {"files_id": a, "n": 0, "data": b"ab"},
+            {"files_id": a, "n": 1, "data": b"cd"},
+            {"files_id": b, "n": 0, "data": b"xy"},
+        ]
+
+        result = find_derivative_contents(["m1", "m2", "m3", "m1"], INLINE_PREVIEW_SIZE)
+        self.assertEqual(result, {"m1": ("image/jpeg", b"abcd"), "m2": ("image/webp", b"xy")})
+        self.files.find.assert_called_once()
+        self.chunks.find.assert_called_once()
+        query = self.files.find.call_args[0][0]
+        self.assertEqual(sorted(query["image_md5"]["$in"]), ["m1", "m2", "m3"])
+        self.assertEqual(query["size"], thumbnails.snap_size(INLINE_PREVIEW_SIZE))
+
+    def test_missing_derivatives_are_not_generated(self):
+        self.files.find.return_value.sort.return_value = []
+        with mock.patch.object(thumbnails, "store_derivatives") as store:
+            self.assertEqual(find_derivative_contents(["m1"], INLINE_PREVIEW_SIZE), {})
+        store.assert_not_called()
+        self.chunks.find.assert_not_called()
@@ -0,0 +1,76 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from employees import inference, warmup
+
+
+class WarmUpTests(SimpleTestCase):
+    def setUp(self):
+        patchers = [
+            mock.patch.object(warmup, "_ready", threading.Event()),
+            mock.patch.dict(warmup._state, {"status": "pending", "error": None}),
+            mock.patch.object(inference, "is_enabled", return_value=False),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_not_ready_until_the_models_are_warm(self):
+        self.assertFalse(warmup.is_ready())
+        self.assertEqual(self.client.get('/_b_a_c_k_e_n_d/HR/ready/').status_code, 503)
+
+        with mock.patch("employees.face_utils.warm_up_models") as warm_up_models:
+            warmup.warm_up()
+        warm_up_models.assert_called_once_with()
+        self.assertTrue(warmup.is_ready())
+        self.assertEqual(warmup.status(), {"status": "ready", "error": None})
+        self.assertEqual(self.client.get('/_b_a_c_k_e_n_d/HR/ready/').status_code, 200)
+
+    def test_failed_warm_up_stays_not_ready(self):
+        with mock.patch("employees.face_utils.warm_up_models", side_effect=RuntimeError("no weights")):
+            warmup.warm_up()
+        self.assertFalse(warmup.is_ready())
+        self.assertEqual(warmup.status(), {"status": "failed", "error": "no weights"})
+        response = self.client.get('/_b_a_c_k_e_n_d/HR/ready/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "failed")
+
+    def test_inference_pool_is_started_instead_when_enabled(self):
+        with mock.patch.object(inference, "is_enabled", return_value=True), \
+                mock.patch.object(inference, "start") as start_pool, \
+                mock.patch("employees.face_utils.warm_up_models") as warm_up_models:
+            warmup.warm_up()
+        start_pool.assert_called_once_with()
+        warm_up_models.assert_not_called()
+        self.assertTrue(warmup.is_ready())
+
+    def test_non_serving_processes_are_ready_without_warming_up(self):
+        with mock.patch.object(warmup, "is_serving_process", return_value=False), \
+                mock.patch.object(warmup.threading, "Thread") as thread:
+            warmup.start()
+        thread.assert_not_called()
+        self.assertTrue(warmup.is_ready())
+
+
+class ServingProcessTests(SimpleTestCase):
+    def _serving(self, argv, environ=None):
+        with mock.patch.object(warmup.sys, "argv", argv), \
+                mock.patch.dict(warmup.sys.modules), \
+                mock.patch.dict(warmup.os.environ, environ or {}, clear=True):
+            warmup.sys.modules.pop("pytest", None)
+            return warmup.is_serving_process()
+
+    def test_servers_warm_up(self):
+        self.assertTrue(self._serving(["/venv/bin/gunicorn", "hr_backend.wsgi"]))
+        self.assertTrue(self._serving(["/venv/lib/uvicorn/__main__.py", "hr_backend.asgi:application"]))
+        self.assertTrue(self._serving(["manage.py", "runserver"], {"RUN_MAIN": "true"}))
+        self.assertTrue(self._serving(["manage.py", "runserver", "--noreload"]))
+
+    def test_other_programs_do_not(self):
+        self.assertFalse(self._serving(["manage.py", "runserver"]))  # autoreloader parent
+        self.assertFalse(self._serving(["manage.py", "migrate"]))
+        self.assertFalse(self._serving(["manage.py"]))
+        self.assertFalse(self._serving(["/venv/bin/celery", "-A", "hr_backend", "worker"]))
+        self.assertFalse(self._serving(["/venv/bin/pytest"]))
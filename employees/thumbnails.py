@@ -0,0 +1,120 @@
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from employees.mongo import hr_db, hr_fs
+from employees.storage import open_image_by_md5
+
+# Longest side of listing thumbnails and of the opt-in inline previews.
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))
+INLINE_PREVIEW_SIZE = int(os.getenv("INLINE_PREVIEW_SIZE", "64"))
+# Sizes pre-generated at enrollment and stored; other requested sizes snap to these.
+THUMBNAIL_SIZES = sorted(
+    {int(v) for v in os.getenv("THUMBNAIL_SIZES", "64,256").split(",")} | {THUMBNAIL_SIZE, INLINE_PREVIEW_SIZE}
+)
+THUMBNAIL_MAX_SIZE = 1024
+# "JPEG" or "WEBP"
+THUMBNAIL_FORMAT = os.getenv("THUMBNAIL_FORMAT", "JPEG").upper()
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+
+CONTENT_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# GridFS bucket in the HR database holding derivatives keyed by (image_md5, size, format)
+DERIVATIVE_BUCKET = "derivatives"
+
+
+def make_thumbnail(image_bytes, size=THUMBNAIL_SIZE, fmt=THUMBNAIL_FORMAT):
+    """
+    Downscale an image so its longest side is at most `size` and re-encode it.
+    Returns (bytes, content_type).
+    """
+    img = Image.open(BytesIO(image_bytes))
+    img.draft("RGB", (size, size))  # JPEG: decode directly at reduced scale
+    img = img.convert("RGB")
+    img.thumbnail((size, size), Image.LANCZOS)
+
+    out = BytesIO()
+    img.save(out, format=fmt, quality=THUMBNAIL_QUALITY)
+    return out.getvalue(), CONTENT_TYPES[fmt]
+
+
+def snap_size(size):
+    """Smallest stored size that is at least `size` (or the largest one)."""
+    for candidate in THUMBNAIL_SIZES:
+        if candidate >= size:
+            return candidate
+    return THUMBNAIL_SIZES[-1]
+
+
+def derivative_bucket():
+    return hr_fs(DERIVATIVE_BUCKET)
+
+
+def find_derivative(image_md5, size, fmt=THUMBNAIL_FORMAT):
+    return derivative_bucket().find_one({"image_md5": image_md5, "size": size, "format": fmt})
+
+
+def find_derivative_contents(image_md5s, size, fmt=THUMBNAIL_FORMAT):
+    """
+    {image_md5: (content_type, bytes)} of the stored derivatives of many images
+    at one snapped size, in two queries (files, then chunks). Images without a
+    stored derivative are left out; nothing is generated.
+    """
+    size = snap_size(size)
+    files = hr_db()[f"{DERIVATIVE_BUCKET}.files"].find(
+        {"image_md5": {"$in": list(set(image_md5s))}, "size": size, "format": fmt},
+        {"image_md5": 1, "contentType": 1},
+    ).sort("uploadDate", 1)
+    # Newest derivative wins if an image has more than one
+    by_id = {doc["image_md5"]: doc for doc in files}
+    if not by_id:
+        return {}
+
+    data = {}
+    chunks = hr_db()[f"{DERIVATIVE_BUCKET}.chunks"].find(
+        {"files_id": {"$in": [doc["_id"] for doc in by_id.values()]}}
+    ).sort([("files_id", 1), ("n", 1)])
+    for chunk in chunks:
+        data.setdefault(chunk["files_id"], []).append(chunk["data"])
+    return {
+        md5: (doc.get("contentType"), b"".join(data[doc["_id"]]))
+        for md5, doc in by_id.items()
+        if doc["_id"] in data
+    }
+
+
+def store_derivatives(image_md5, image_bytes, sizes=THUMBNAIL_SIZES, fmt=THUMBNAIL_FORMAT):
+    """Generate and store the thumbnails of one image that are not stored yet. Returns sizes created."""
+    bucket = derivative_bucket()
+    existing = {
+        doc["size"]
+        for doc in hr_db()[f"{DERIVATIVE_BUCKET}.files"].find(
+            {"image_md5": image_md5, "format": fmt, "size": {"$in": list(sizes)}}, {"size": 1}
+        )
+    }
+    created = []
+    for size in sizes:
+        if size in existing:
+            continue
+        thumb, content_type = make_thumbnail(image_bytes, size=size, fmt=fmt)
+        bucket.put(thumb, image_md5=image_md5, size=size, format=fmt, content_type=content_type)
+        created.append(size)
+    return created
+
+
+def get_thumbnail(image_md5, size, fmt=THUMBNAIL_FORMAT):
+    """
+    GridOut of the stored derivative for (image_md5, snapped size); generated
+    from the original and stored on a miss. None if the original image is unknown.
+    """
+    size = snap_size(size)
+    derivative = find_derivative(image_md5, size, fmt)
+    if derivative:
+        return derivative
+
+    original = open_image_by_md5(image_md5)
+    if not original:
+        return None
+    store_derivatives(image_md5, original.read(), sizes=[size], fmt=fmt)
+    return find_derivative(image_md5, size, fmt)
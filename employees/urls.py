@@ -8,14 +8,23 @@ urlpatterns = [
     path("employees/<str:employee_id>/encode_face/", views.encode_employee_face),
     path('employees/<str:employee_id>/enable_face/', views.enable_facial_recognition),
     path('employees/<str:employee_id>/disable_face/', views.disable_facial_recognition),
+    path('employees/<str:employee_id>/site/', views.set_employee_site, name='set_employee_site'),
+    path('devices/<str:device_id>/sites/', views.device_sites, name='device_sites'),
     path('serve-file/<str:file_id>/', views.serve_file, name="serve_file"),
     path('get_device_info/', views.get_device_info, name="serve_file"),
     path('employees/md5/<str:image_md5>/', views.get_employee_by_md5, name='get_employee_by_md5'),
+    path('employees/md5/<str:image_md5>/thumbnail/', views.employee_thumbnail, name='employee_thumbnail'),
     path('mark/', views.mark_attendance, name='mark_attendance'),
     path('hrregistration/', views.registration, name='registration'),
     path('login/', views.login, name='login'),
     path('attendance-report/', views.attendance_report_with_employee_details, name='attendance_report'),
+    # Native async variants for ASGI deployments
+    path('async/mark/', views.mark_attendance_async, name='mark_attendance_async'),
+    path('async/attendance-report/', views.attendance_report_async, name='attendance_report_async'),
     path('fingerprint-login/', views.fingerprint_login, name='fingerprint-login'),
+    path('ready/', views.readiness, name='readiness'),
+    path('lookups/invalidate/', views.invalidate_lookups, name='invalidate_lookups'),
+    path('metrics/', views.metrics_view, name='metrics'),
 
 
 ]
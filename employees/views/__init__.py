@@ -1,5 +1,6 @@
 from .employee import (
     get_all_employees_with_images,
+    employee_thumbnail,
     get_employee_by_md5,
     get_all_employee_from_global,
     enable_facial_recognition,
@@ -12,10 +13,16 @@ from .attendance import (
     mark_attendance,
     attendance_report_with_employee_details
 )
+from .attendance_async import (
+    mark_attendance_async,
+    attendance_report_async
+)
 from .auth import (
     get_device_info,
     registration,
     login,
     fingerprint_login
 )
+from .system import readiness, invalidate_lookups, metrics_view
+from .sites import set_employee_site, device_sites
 from .utils import save_or_update_encoding
@@ -1,86 +1,166 @@
 from datetime import datetime
-import numpy as np
-import os
-from pymongo import MongoClient
 
 from django.http import JsonResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
-from employees.models import Employee, EmployeeAttendance
-from employees.face_utils import base64_to_encoding, compare_encodings, imagefile_to_encoding, SpoofingDetectedError
+from employees import metrics, reports
+from employees.attendance_writer import create_attendance
+from employees.debounce import IN_PROGRESS as PUNCH_IN_PROGRESS, claim_punch, release_punch, remember_punch
+from employees.idempotency import IN_PROGRESS, claim, release, remember_result, request_key
+from employees.face_utils import base64_to_bytes, SpoofingDetectedError
+from employees.inference import encode_image, InferenceBusyError
+from employees.face_gallery import gallery
+from employees.sites import sites_for_device
 from pyauth.auth import HasRolePermission
 
-from .utils import to_list
-
-@api_view(['POST'])
-@permission_classes([HasRolePermission])
-def mark_attendance(request):
-    image_file = request.FILES.get('image')
-    image_b64 = request.data.get('image')
-    employee_id = request.data.get('auth-user-id')
-    # print(f"Marking attendance for employee_id: {employee_id}")
-    # Handle both file and base64 image input
+def _mark(image, device_id, mode):
+    """Recognise the face in `image` and record the punch. Returns (body, status)."""
     try:
-        if image_file:
-            unknown_encoding = imagefile_to_encoding(image_file)
-        elif image_b64:
-            unknown_encoding = base64_to_encoding(image_b64)
-        else:
-            return Response({"error": "Image is required"}, status=400)
+        unknown_encoding = encode_image(image)
     except SpoofingDetectedError:
-        return Response({"error": "Spoofing detected! Real face required."}, status=400)
+        return {"error": "Spoofing detected! Real face required."}, 400
+    except InferenceBusyError:
+        return {"error": "Recognition service busy, please retry"}, 503
+    return _mark_encoding(unknown_encoding, device_id, mode)
 
-    if not unknown_encoding:
-        return Response({"error": "No face found in image"}, status=400)
 
-    # Load all employees with valid face encodings
-    employees = Employee.objects.exclude(current_face_encoding__isnull=True)
+def _mark_encoding(unknown_encoding, device_id, mode):
+    """Everything after inference: match, debounce, record the punch. Returns (body, status)."""
+    if not unknown_encoding:
+        return {"error": "No face found in image"}, 400
+
+    # Match against the in-memory gallery, restricted to the sites this device serves
+    with metrics.stage("match"):
+        match = gallery.match(unknown_encoding, sites=sites_for_device(device_id))
+    if not match.is_match:
+        return {"error": "User Not Found"}, 404
+
+    # Repeat taps inside the debounce window get the punch already recorded
+    punch = claim_punch(match.employee_id, mode)
+    if punch is PUNCH_IN_PROGRESS:
+        return {"error": "A punch for this employee is still being recorded, retry shortly"}, 409
+    if punch:
+        metrics.mark_cache_hits.inc(cache="debounce")
+        return dict(punch, duplicate=True), 200
 
-    matched_employee = None
-    best_distance = float('inf')
+    # Save Attendance
+    try:
+        with metrics.stage("insert"):
+            att = create_attendance(
+                employee_id=match.employee_id,
+                device_id=device_id or 'unknown_device',
+                attendence_type=mode,
+                confidence=match.distance
+            )
+    except Exception:
+        release_punch(match.employee_id, mode)
+        raise
+
+    punch = {
+        "employee": match.employee_id,
+        "name": match.name,
+        "mode": att.attendence_type,
+        "timestamp": att.attendence_time,
+        "confidence": match.distance
+    }
+    remember_punch(match.employee_id, mode, punch)
+    return punch, 201
 
-    for emp in employees:
-        # ✅ Use custom active check instead of field
-        if not emp.is_active:
-            continue
 
-        emp_encoding = to_list(emp.current_face_encoding)
-        unknown_encoding_np = np.array(unknown_encoding)
+@api_view(['POST'])
+@permission_classes([HasRolePermission])
+def mark_attendance(request):
+    """
+    Recognise the employee in `image` (upload or base64) and record a punch.
+    Retries with the same Idempotency-Key header / idempotency_key field, or
+    the same image, get the original response for a short time; a retry that
+    arrives while the original is still running waits for it (409 if it
+    doesn't finish in time).
+    """
+    image_file = request.FILES.get('image')
+    image_b64 = request.data.get('image')
+    device_id = request.data.get('auth-user-id')
+    mode = request.data.get('mode', 'IN')
+    # Handle both file and base64 image input
+    if image_file:
+        image = image_file
+    elif image_b64:
+        image = base64_to_bytes(image_b64)
+    else:
+        return Response({"error": "Image is required"}, status=400)
+
+    key = request_key(
+        request.headers.get('Idempotency-Key') or request.data.get('idempotency_key'), image, device_id, mode
+    )
+    cached = claim(key)
+    if cached is IN_PROGRESS:
+        return Response({"error": "A request with this key is still in progress, retry shortly"}, status=409)
+    if cached:
+        metrics.mark_cache_hits.inc(cache="idempotency")
+        status, body = cached
+        return Response(body, status=status, headers={"Idempotent-Replayed": "true"})
 
-        if len(emp_encoding) == 0 or len(unknown_encoding_np) == 0:
-            continue  # skip invalid encodings
+    try:
+        body, status = _mark(image, device_id, mode)
+    except Exception:
+        release(key)
+        raise
+    remember_result(key, status, body)
+    return Response(body, status=status)
 
-        # We only care about the distance here to find the absolute best match
-        # compare_encodings returns (is_match, distance)
-        _, dist = compare_encodings(emp_encoding, unknown_encoding_np)
-        
-        if dist < best_distance:
-            best_distance = dist
-            matched_employee = emp
 
-    # Check if the best match found is within our acceptable threshold (0.5)
-    if not matched_employee or best_distance > 0.5:
-        return Response({"error": "User Not Found"}, status=404)
+def _report_params(query):
+    """
+    Parse the attendance report query string (shared with the async view).
+    Returns (params, error); `error` is a message for a 400 response.
+    """
+    from_date = query.get('from_date')
+    to_date = query.get('to_date')
+
+    if not from_date or not to_date:
+        now = datetime.now()
+        from_date = datetime(now.year, now.month, 1)
+        to_date = datetime(now.year, now.month + 1, 1) if now.month < 12 else datetime(now.year + 1, 1, 1)
+    else:
+        try:
+            from_date = datetime.strptime(from_date, "%Y-%m-%d")
+            to_date = datetime.strptime(to_date, "%Y-%m-%d")
+        except ValueError:
+            return None, "from_date and to_date must be YYYY-MM-DD"
 
-    mode = request.data.get('mode', 'IN')
+    stream = query.get('stream')
+    if stream and stream not in reports.STREAM_FORMATS:
+        return None, f"stream must be one of {', '.join(reports.STREAM_FORMATS)}"
 
-    # Save Attendance
-    att = EmployeeAttendance.objects.create(
-        employee_id=matched_employee.employee_id,
-        device_id=request.data.get('auth-user-id', 'unknown_device'),
-        attendence_type=mode,
-        confidence=best_distance
-    )
+    engine = query.get('engine', reports.REPORT_ENGINE)
+    if engine not in reports.REPORT_ENGINES:
+        return None, f"engine must be one of {', '.join(reports.REPORT_ENGINES)}"
 
-    return Response({
-        "employee": matched_employee.employee_id,
-        "name": matched_employee.name,
-        "mode": att.attendence_type,
-        "timestamp": att.attendence_time,
-        "confidence": best_distance
-    }, status=201)
+    try:
+        cursor = query.get('cursor')
+        after = reports.decode_cursor(cursor) if cursor else None
+    except reports.InvalidCursor as e:
+        return None, str(e)
+
+    limit = None
+    if 'limit' in query or cursor:
+        try:
+            limit = min(int(query.get('limit', reports.REPORT_MAX_PAGE_SIZE)), reports.REPORT_MAX_PAGE_SIZE)
+        except ValueError:
+            return None, "limit must be an integer"
+        if limit < 1:
+            return None, "limit must be positive"
+
+    return {
+        "from_date": from_date,
+        "to_date": to_date,
+        "stream": stream,
+        "engine": engine,
+        "after": after,
+        "limit": limit,
+    }, None
 
 
 @api_view(['GET'])
@@ -89,73 +169,31 @@ def attendance_report_with_employee_details(request):
     """
     Get attendance records filtered by date and merged with employee details.
     Example: /api/attendance-report/?from_date=2025-10-01&to_date=2025-10-14
+    Pagination: add ?limit=500 (and ?cursor=<next_cursor> for following pages).
+    Streaming: add ?stream=ndjson or ?stream=csv to stream the whole range.
+    Join engine: ?engine=orm|aggregate (default from ATTENDANCE_REPORT_ENGINE).
     """
     try:
-        # ---- Date Filtering ----
-        from_date = request.GET.get('from_date')
-        to_date = request.GET.get('to_date')
-
-        if not from_date or not to_date:
-            now = datetime.now()
-            from_date = datetime(now.year, now.month, 1)
-            to_date = datetime(now.year, now.month + 1, 1) if now.month < 12 else datetime(now.year + 1, 1, 1)
-        else:
-            from_date = datetime.strptime(from_date, "%Y-%m-%d")
-            to_date = datetime.strptime(to_date, "%Y-%m-%d")
-
-        # ---- Fetch Attendance Records ----
-        records = EmployeeAttendance.objects.filter(
-            attendence_time__gte=from_date,
-            attendence_time__lt=to_date
-        ).order_by('-attendence_time')
-
-        if not records.exists():
-            return Response([], status=200)
-
-        # ---- Mongo Connection ----
-        mongo_uri = os.environ.get("GLOBAL_DB_HOST")
-        db_name = os.environ.get("GLOBAL_DB_NAME", "Global")
-        client = MongoClient(mongo_uri)
-        db = client[db_name]
-
-        profiles = db['backend_diagnostics_profile']
-        departments = db['backend_diagnostics_Departments']
-        designations = db['backend_diagnostics_Designation']
-
-        # ---- Create Lookup Maps ----
-        dept_map = {
-            d.get('department_code'): d.get('department_name')
-            for d in departments.find({'is_active': True})
-        }
-        desig_map = {
-            d.get('Designation_code'): d.get('designation')
-            for d in designations.find({'is_active': True})
-        }
-
-        # ---- Create Employee Lookup ----
-        employee_map = {}
-        for emp in profiles.find():
-            employee_map[emp.get("employeeId")] = {
-                "employeeName": emp.get("employeeName"),
-                "department": dept_map.get(emp.get("department"), emp.get("department")),
-                "designation": desig_map.get(emp.get("designation"), emp.get("designation")),
-            }
+        params, error = _report_params(request.GET)
+        if error:
+            return Response({"error": error}, status=400)
+        from_date, to_date = params["from_date"], params["to_date"]
+        engine, after = params["engine"], params["after"]
+
+        # ---- Streaming: chunked iteration, flat memory ----
+        if params["stream"]:
+            rows = reports.report_rows(from_date, to_date, after=after, engine=engine)
+            return reports.streaming_report(rows, params["stream"])
+
+        # ---- Paginated ----
+        if params["limit"]:
+            results, next_cursor = reports.report_page(
+                from_date, to_date, after=after, limit=params["limit"], engine=engine
+            )
+            return Response({"results": results, "next_cursor": next_cursor}, status=200)
 
         # ---- Combine Attendance + Employee Info ----
-        result = []
-        for r in records:
-            emp_info = employee_map.get(r.employee_id, {})
-            result.append({
-                "employee_id": r.employee_id,
-                "employee_name": emp_info.get("employeeName", "Unknown"),
-                "department": emp_info.get("department", "N/A"),
-                "designation": emp_info.get("designation", "N/A"),
-                "device_id": r.device_id,
-                "attendence_type": r.attendence_type,
-                "attendence_time": r.attendence_time,
-                "confidence": r.confidence,
-            })
-
+        result = list(reports.report_rows(from_date, to_date, engine=engine))
         return Response(result, status=200)
 
     except Exception as e:
@@ -0,0 +1,135 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.views import APIView
+
+from employees import metrics, reports
+from employees.idempotency import IN_PROGRESS, claim, release, remember_result, request_key
+from employees.face_utils import base64_to_bytes, SpoofingDetectedError
+from employees.inference import encode_image_async, InferenceBusyError
+from pyauth.auth import HasRolePermission
+
+from .attendance import _mark_encoding, _report_params
+
+# Django 3.2 async views: plain coroutines (DRF's @api_view is sync-only), so
+# the DRF request, permission check and csrf exemption are done by hand.
+# Blocking Mongo / numpy work (matching, debounce, idempotency, inserts, the
+# report) goes through sync_to_async(thread_sensitive=False): it runs in the
+# shared thread pool, so a long report never holds up a kiosk's punch. Django
+# gives each pool thread its own connection wrapper, and they all share
+# djongo's thread-safe MongoClient. Only the third-party permission check stays
+# on the single thread-sensitive sync thread.
+
+
+def _in_thread(fn):
+    return sync_to_async(fn, thread_sensitive=False)
+
+
+def _on_sync_thread(fn):
+    return sync_to_async(fn)
+
+
+def _drf_request(request):
+    view = APIView()
+    return view, view.initialize_request(request)
+
+
+def _has_permission(view, drf_request):
+    return HasRolePermission().has_permission(drf_request, view)
+
+
+def _read_mark_input(drf_request):
+    image_file = drf_request.FILES.get('image')
+    image = image_file or drf_request.data.get('image')
+    if image and not image_file:
+        image = base64_to_bytes(image)
+    explicit_key = drf_request.headers.get('Idempotency-Key') or drf_request.data.get('idempotency_key')
+    return image, drf_request.data.get('auth-user-id'), drf_request.data.get('mode', 'IN'), explicit_key
+
+
+async def _mark_async(image, device_id, mode):
+    """_mark() with awaited inference; the rest is the shared sync code. Returns (body, status)."""
+    try:
+        unknown_encoding = await encode_image_async(image)
+    except SpoofingDetectedError:
+        return {"error": "Spoofing detected! Real face required."}, 400
+    except InferenceBusyError:
+        return {"error": "Recognition service busy, please retry"}, 503
+    return await _in_thread(_mark_encoding)(unknown_encoding, device_id, mode)
+
+
+async def mark_attendance_async(request):
+    """
+    Async twin of mark_attendance (same contract) for ASGI deployments:
+    inference runs in an executor / the inference pool and DB work in worker
+    threads, so one worker keeps many kiosk requests in flight.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+
+    view, drf_request = _drf_request(request)
+    if not await _on_sync_thread(_has_permission)(view, drf_request):
+        return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+
+    image, device_id, mode, explicit_key = await _in_thread(_read_mark_input)(drf_request)
+    if not image:
+        return JsonResponse({"error": "Image is required"}, status=400)
+
+    key = await _in_thread(request_key)(explicit_key, image, device_id, mode)
+    cached = await _in_thread(claim)(key)
+    if cached is IN_PROGRESS:
+        return JsonResponse({"error": "A request with this key is still in progress, retry shortly"}, status=409)
+    if cached:
+        metrics.mark_cache_hits.inc(cache="idempotency")
+        status, body = cached
+        response = JsonResponse(body, status=status)
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+    try:
+        body, status = await _mark_async(image, device_id, mode)
+    except Exception:
+        await _in_thread(release)(key)
+        raise
+    await _in_thread(remember_result)(key, status, body)
+    return JsonResponse(body, status=status)
+
+
+async def attendance_report_async(request):
+    """
+    Async twin of attendance_report_with_employee_details for the paginated
+    and full JSON forms. Django 3.2 can't stream from async views, so
+    ?stream= is only served by the sync endpoint.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+
+    try:
+        params, error = _report_params(request.GET)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+        if params["stream"]:
+            return JsonResponse({"error": "stream is only supported on /attendance-report/"}, status=400)
+        from_date, to_date = params["from_date"], params["to_date"]
+        engine, after = params["engine"], params["after"]
+
+        # ---- Paginated ----
+        if params["limit"]:
+            results, next_cursor = await _in_thread(reports.report_page)(
+                from_date, to_date, after=after, limit=params["limit"], engine=engine
+            )
+            return JsonResponse({"results": results, "next_cursor": next_cursor}, status=200)
+
+        # ---- Combine Attendance + Employee Info ----
+        def _all_rows():
+            return list(reports.report_rows(from_date, to_date, engine=engine))
+
+        return JsonResponse(await _in_thread(_all_rows)(), safe=False, status=200)
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+# DRF views are csrf-exempt; django.views.decorators.csrf.csrf_exempt would
+# wrap these coroutines in a sync function, so set the flag directly.
+mark_attendance_async.csrf_exempt = True
+attendance_report_async.csrf_exempt = True
@@ -1,88 +1,128 @@
-import os
 import base64
 import gridfs
-import hashlib
 import mimetypes
-import requests
-from io import BytesIO
 from bson import ObjectId
-from pymongo import MongoClient
+from bson.errors import InvalidId
 from dotenv import load_dotenv
 
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, Http404
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 
-from employees.models import Employee
+from employees.models import Employee, EmployeeEncodingHistory
 from employees.serializers import EmployeeCreateSerializer
-from employees.face_utils import imagefile_to_encoding, compute_md5
-
-from .utils import save_or_update_encoding
+from employees.face_utils import compute_md5
+from employees.inference import encode_image, InferenceBusyError
+from employees.face_gallery import gallery
+from employees.mongo import PROFILE_COLLECTION, global_db, global_fs, hr_fs
+from employees.lookups import department_map, designation_map, global_profiles
+from employees.storage import find_images_by_md5, gridfs_response, open_image_by_md5, read_profile_image
+from employees.thumbnails import (
+    INLINE_PREVIEW_SIZE, THUMBNAIL_MAX_SIZE, THUMBNAIL_SIZE, find_derivative_contents, get_thumbnail, store_derivatives,
+)
+
+from .utils import save_or_update_encoding, to_list
 
 load_dotenv()
 
+EMPLOYEES_PAGE_SIZE = 100
+EMPLOYEES_MAX_PAGE_SIZE = 500
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_all_employees_with_images(request):
     """
-    Fetch all employees from Django DB with image previews.
-    - First checks the 'HR' MongoDB database for the image.
-    - If not found, checks the 'Global' MongoDB database.
+    Fetch all employees from Django DB with image preview URLs.
+    - Images are resolved by md5 with one query per database (HR first, then Global).
+    - image_preview is a thumbnail URL; add ?inline=1 for small base64 previews instead
+      (stored derivatives only, fetched for the page in one query; null when missing).
+    - Add ?page=N&page_size=M to paginate.
     """
     try:
         # 1️⃣ Fetch employees from local Django DB
-        employees = Employee.objects.all().order_by("employee_id")
-        if not employees.exists():
-            return JsonResponse({"message": "No employees found"}, status=404)
+        employees = Employee.objects.order_by("employee_id").values(
+            "employee_id", "name", "is_active", "image_md5", "created_date", "lastmodified_date"
+        )
 
-        # 2️⃣ Connect to MongoDB & GridFS for both databases
-        mongo_uri = os.getenv("GLOBAL_DB_HOST")
-        hr_db_name = os.getenv("GLOBAL_DB_NAME_HR", "HR")
-        global_db_name = os.getenv("GLOBAL_DB_NAME_GLOBAL", "Global")
+        paginate = 'page' in request.GET or 'page_size' in request.GET
+        if paginate:
+            try:
+                page = max(int(request.GET.get('page', 1)), 1)
+                page_size = int(request.GET.get('page_size', EMPLOYEES_PAGE_SIZE))
+            except ValueError:
+                return JsonResponse({"error": "page and page_size must be integers"}, status=400)
+            page_size = min(max(page_size, 1), EMPLOYEES_MAX_PAGE_SIZE)
+            total = employees.count()
+            employees = employees[(page - 1) * page_size:page * page_size]
+
+        employees = list(employees)
+        if not employees and not paginate:
+            return JsonResponse({"message": "No employees found"}, status=404)
 
-        client = MongoClient(mongo_uri)
-        fs_hr = gridfs.GridFS(client[hr_db_name])
-        fs_global = gridfs.GridFS(client[global_db_name])
+        # 2️⃣ Resolve all image md5s in HR, then Global GridFS
+        images = find_images_by_md5(emp["image_md5"] for emp in employees)
+        inline = request.GET.get('inline') in ('1', 'true')
+        base_url = request.build_absolute_uri('/')[:-1]
+        # Inline previews come from stored derivatives only, fetched for the whole page at once
+        previews = find_derivative_contents(
+            [emp["image_md5"] for emp in employees if emp["image_md5"] in images], INLINE_PREVIEW_SIZE
+        ) if inline else {}
 
         # 3️⃣ Build response list
         employee_list = []
         for emp in employees:
-            base64_img = None
-
-            if emp.image_md5:
-                file_obj = fs_hr.find_one({"md5": emp.image_md5})
-                if not file_obj:  # ⏩ Check Global DB if not found in HR
-                    file_obj = fs_global.find_one({"md5": emp.image_md5})
-
-                if file_obj:
-                    try:
-                        img_bytes = file_obj.read()
-                        base64_img = (
-                            f"data:image/jpeg;base64,{base64.b64encode(img_bytes).decode('utf-8')}"
-                        )
-                    except Exception:
-                        base64_img = None
-
-            employee_list.append({
-                "employee_id": emp.employee_id,
-                "name": emp.name,
-                "is_active": emp.is_active,
-                "image_md5": emp.image_md5,
-                "created_date": emp.created_date,
-                "lastmodified_date": emp.lastmodified_date,
-                "image_preview": base64_img,
-            })
+            image_preview = None
+            md5 = emp["image_md5"]
+
+            if md5 in images:
+                if inline:
+                    if md5 in previews:
+                        content_type, data = previews[md5]
+                        image_preview = f"data:{content_type};base64,{base64.b64encode(data).decode('utf-8')}"
+                else:
+                    image_preview = f"{base_url}/employees/md5/{md5}/thumbnail/"
+
+            employee_list.append(dict(emp, image_preview=image_preview))
 
         # 4️⃣ Return JSON response
+        if paginate:
+            return JsonResponse({
+                "results": employee_list,
+                "page": page,
+                "page_size": page_size,
+                "total": total,
+            }, status=200)
         return JsonResponse(employee_list, safe=False, status=200)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def employee_thumbnail(request, image_md5):
+    """
+    Serve a downscaled copy of the employee image with this md5 from the
+    derivatives bucket (generated on first request if missing).
+    Optional ?size=<px> (longest side, snapped to THUMBNAIL_SIZES).
+    """
+    try:
+        size = int(request.GET.get('size', THUMBNAIL_SIZE))
+    except ValueError:
+        return Response({"error": "size must be an integer"}, status=400)
+    if size < 1:
+        return Response({"error": "size must be positive"}, status=400)
+    size = min(size, THUMBNAIL_MAX_SIZE)
+    thumb = get_thumbnail(image_md5, size)
+    if not thumb:
+        raise Http404("Image not found")
+
+    return gridfs_response(request, thumb, cache_control='public, max-age=86400')
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_employee_by_md5(request, image_md5):
@@ -91,18 +131,14 @@ def get_employee_by_md5(request, image_md5):
     """
     try:
         # 1️⃣ Find employee in Django DB
-        emp = Employee.objects.filter(image_md5=image_md5).first()
+        emp = Employee.objects.filter(image_md5=image_md5).only(
+            "employee_id", "name", "is_active", "image_md5", "created_date", "lastmodified_date"
+        ).first()
         if not emp:
             return JsonResponse({"error": "No employee found for this MD5"}, status=404)
 
-        # 2️⃣ Connect to MongoDB to fetch image
-        mongo_uri = os.getenv("GLOBAL_DB_HOST")
-        global_db = os.getenv("GLOBAL_DB_NAME", "HR")
-        client = MongoClient(mongo_uri)
-        fs = gridfs.GridFS(client[global_db])
-
-        # 3️⃣ Find image file by MD5 hash in GridFS
-        file_obj = fs.find_one({"md5": image_md5})
+        # 2️⃣ Find image file by MD5 hash in GridFS (HR first, then Global)
+        file_obj = open_image_by_md5(image_md5)
         if not file_obj:
             # Image not found in GridFS — still return employee info
             return JsonResponse({
@@ -114,11 +150,11 @@ def get_employee_by_md5(request, image_md5):
                 "message": "Employee found, but image not found in GridFS"
             }, status=200)
 
-        # 4️⃣ Read image bytes
+        # 3️⃣ Read image bytes
         img_bytes = file_obj.read()
         base64_img = base64.b64encode(img_bytes).decode('utf-8')
 
-        # 5️⃣ Return employee + base64 preview
+        # 4️⃣ Return employee + base64 preview
         return JsonResponse({
             "employee_id": emp.employee_id,
             "name": emp.name,
@@ -135,21 +171,23 @@ def get_employee_by_md5(request, image_md5):
 
 @api_view(['POST'])
 def enable_facial_recognition(request, employee_id):
-    emp = get_object_or_404(Employee, employee_id=employee_id)
+    emp = get_object_or_404(Employee.objects.only(*Employee.HOT_FIELDS), employee_id=employee_id)
     emp.is_active = True
-    emp.save(update_fields=['is_active'])
+    emp.save(update_fields=['is_active', 'lastmodified_date'])
+    gallery.upsert(emp.employee_id, emp.name, emp.current_face_encoding, emp.is_active, emp.site)
     return Response({"success": True, "employee_id": emp.employee_id})
 
 
 @api_view(['POST'])
 def disable_facial_recognition(request, employee_id):
-    emp = get_object_or_404(Employee, employee_id=employee_id)
+    emp = get_object_or_404(Employee.objects.only(*Employee.HOT_FIELDS), employee_id=employee_id)
 
-    if not emp.current_face_encoding:
+    if emp.current_face_encoding is None:
         return Response({"error": "No active face encoding found"}, status=400)
 
     emp.is_active = False
-    emp.save(update_fields=['is_active'])
+    emp.save(update_fields=['is_active', 'lastmodified_date'])
+    gallery.remove(emp.employee_id)
     return Response({"success": True, "employee_id": emp.employee_id})
 
 
@@ -161,28 +199,10 @@ def get_all_employee_from_global(request):
     include profile image URLs, encoding status, and local is_active flag.
     """
     try:
-        # ✅ Connect to Global MongoDB
-        mongo_uri = os.environ.get("GLOBAL_DB_HOST")
-        db_name = os.environ.get("GLOBAL_DB_NAME", "Global")
-        client = MongoClient(mongo_uri)
-        db = client[db_name]
-
-        profiles_col = db['backend_diagnostics_profile']
-        departments_col = db['backend_diagnostics_Departments']
-        designations_col = db['backend_diagnostics_Designation']
-
-        # ✅ Fetch all employees from Global DB
-        global_employees = list(profiles_col.find())
-
-        # ✅ Create department & designation lookup maps
-        dept_map = {
-            d.get('department_code'): d.get('department_name')
-            for d in departments_col.find({'is_active': True})
-        }
-        desig_map = {
-            d.get('Designation_code'): d.get('designation')
-            for d in designations_col.find({'is_active': True})
-        }
+        # ✅ All employees from Global DB + department & designation lookup maps (cached)
+        global_employees = global_profiles()
+        dept_map = department_map()
+        desig_map = designation_map()
 
         # ✅ Fetch all locally stored employees
         local_employees = Employee.objects.all().values(
@@ -192,7 +212,7 @@ def get_all_employee_from_global(request):
         # Build a dictionary of {employee_id: {has_encoding, is_active}}
         local_employee_map = {
             str(emp["employee_id"]): {
-                "has_encoding": bool(emp["current_face_encoding"]),
+                "has_encoding": emp["current_face_encoding"] is not None,
                 "is_active": emp["is_active"]
             }
             for emp in local_employees
@@ -263,28 +283,30 @@ def register_employee(request):
     image_md5 = compute_md5(image_file)
 
     # ✅ Convert image to face encoding
-    encoding = imagefile_to_encoding(image_file)
+    image_bytes = image_file.read()
+    try:
+        encoding = encode_image(image_bytes)
+    except InferenceBusyError:
+        return JsonResponse({"error": "Recognition service busy, please retry"}, status=503)
     if not encoding:
         return JsonResponse({"error": "No face detected in uploaded image"}, status=400)
 
     try:
-        # ✅ Connect to MongoDB (use your local or cloud URI)
-        mongo_uri = os.getenv("GLOBAL_DB_HOST")
-        global_db = os.getenv("HR_DB_NAME", "HR")
-        client = MongoClient(mongo_uri)
-        db = client[global_db]
-        fs = gridfs.GridFS(db)
-
-        # ✅ Save image to GridFS
-        image_file.seek(0)  # reset pointer
-        gridfs_file_id = fs.put(
-            image_file.read(),
+        # ✅ Save image to HR GridFS
+        gridfs_file_id = hr_fs().put(
+            image_bytes,
             filename=f"{employee_id}_{name}.jpg",
             content_type=image_file.content_type,
             employeeId=employee_id,
             md5=image_md5
         )
 
+        # ✅ Pre-generate thumbnails for listings
+        try:
+            store_derivatives(image_md5, image_bytes)
+        except Exception as e:
+            print(f"⚠️ Thumbnail generation failed for {employee_id}: {e}")
+
         # ✅ Save encoding & metadata in Employee model
         emp = save_or_update_encoding(
             employee_id,
@@ -305,8 +327,8 @@ def register_employee(request):
             "name": emp.name,
             "image_md5": emp.image_md5,
             "gridfs_image_id": str(gridfs_file_id),
-            "current_face_encoding_count": len(emp.current_face_encoding or []),
-            "face_encoding_history_count": len(emp.face_encoding_data_history or [])
+            "current_face_encoding_count": len(to_list(emp.current_face_encoding)),
+            "face_encoding_history_count": EmployeeEncodingHistory.objects.filter(employee_id=emp.employee_id).count()
         })
 
     except Exception as e:
@@ -317,10 +339,7 @@ def register_employee(request):
 @permission_classes([AllowAny])
 def encode_employee_face(request, employee_id):
     try:
-        mongo_uri = os.getenv("GLOBAL_DB_HOST")
-        global_db = os.getenv("GLOBAL_DB_NAME", "Global")
-        client = MongoClient(mongo_uri)
-        global_profiles = client[global_db]['backend_diagnostics_profile']
+        global_profiles = global_db()[PROFILE_COLLECTION]
 
         emp = global_profiles.find_one({"employeeId": employee_id})
         if not emp:
@@ -331,20 +350,25 @@ def encode_employee_face(request, employee_id):
         if not profile_img_id:
             return JsonResponse({"error": "Profile image missing"}, status=400)
 
-        base_url = request.build_absolute_uri('/')[:-1]
-        image_url = f"{base_url}/serve-file/{profile_img_id}/"
-        resp = requests.get(image_url, timeout=10)
-        resp.raise_for_status()
-
-        img_bytes = BytesIO(resp.content)
-        
-        # ✅ Compute MD5 for fetched image
-        image_md5 = hashlib.md5(resp.content).hexdigest()
+        # ✅ Read the image straight from Global GridFS, hashing it as it streams
+        try:
+            image_bytes, image_md5 = read_profile_image(profile_img_id)
+        except (gridfs.NoFile, InvalidId):
+            return JsonResponse({"error": "Profile image not found"}, status=404)
 
-        encoding = imagefile_to_encoding(img_bytes)
+        try:
+            encoding = encode_image(image_bytes)
+        except InferenceBusyError:
+            return JsonResponse({"error": "Recognition service busy, please retry"}, status=503)
         if not encoding:
             return JsonResponse({"error": "No face detected in image"}, status=422)
 
+        # ✅ Pre-generate thumbnails for listings
+        try:
+            store_derivatives(image_md5, image_bytes)
+        except Exception as e:
+            print(f"⚠️ Thumbnail generation failed for {employee_id}: {e}")
+
         emp_obj = save_or_update_encoding(
             employee_id,
             encoding,
@@ -359,7 +383,7 @@ def encode_employee_face(request, employee_id):
             "name": emp_obj.name,
             "image_md5": emp_obj.image_md5,
             "is_active": emp_obj.is_active,
-            "current_face_encoding": emp_obj.current_face_encoding
+            "current_face_encoding": to_list(emp_obj.current_face_encoding)
         })
 
     except Exception as e:
@@ -369,9 +393,7 @@ def encode_employee_face(request, employee_id):
 @api_view(['GET'])
 def serve_file(request, file_id):
     try:
-        client = MongoClient(os.getenv('GLOBAL_DB_HOST'))
-        db = client[os.getenv('GLOBAL_DB_NAME','Global')]
-        fs = gridfs.GridFS(db)
+        fs = global_fs()
 
         file_id = ObjectId(file_id)
         file = fs.get(file_id)
@@ -381,9 +403,10 @@ def serve_file(request, file_id):
         if not content_type:
             content_type = file.content_type or 'application/octet-stream'  # fallback
 
-        response = HttpResponse(file.read(), content_type=content_type)
-        response['Content-Disposition'] = f'inline; filename="{file.filename}"'
-        return response
-
     except Exception as e:
         raise Http404(f"File not found or invalid: {str(e)}")
+
+    # Streamed in chunks with ETag/Range support; 304s never touch the chunks
+    response = gridfs_response(request, file, content_type=content_type)
+    response['Content-Disposition'] = f'inline; filename="{file.filename}"'
+    return response
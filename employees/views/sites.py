@@ -0,0 +1,34 @@
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from employees.sites import set_device_sites, sites_for_device
+from employees.face_gallery import gallery
+from employees.models import Employee
+
+
+@api_view(['POST'])
+def set_employee_site(request, employee_id):
+    """
+    Assign an employee to a site: {"site": "<code>"}; null or "" = any site.
+    """
+    emp = get_object_or_404(Employee.objects.only(*Employee.HOT_FIELDS), employee_id=employee_id)
+    emp.site = request.data.get('site') or None
+    emp.save(update_fields=['site', 'lastmodified_date'])
+    gallery.upsert(emp.employee_id, emp.name, emp.current_face_encoding, emp.is_active, emp.site)
+    return Response({"success": True, "employee_id": emp.employee_id, "site": emp.site})
+
+
+@api_view(['GET', 'POST'])
+def device_sites(request, device_id):
+    """
+    GET: sites served by a kiosk (its auth-user-id).
+    POST {"sites": ["<code>", ...]}: replace them; [] = match against all employees.
+    """
+    if request.method == 'POST':
+        sites = request.data.get('sites')
+        if not isinstance(sites, list) or not all(isinstance(s, str) and s for s in sites):
+            return Response({"error": "sites must be a list of site codes"}, status=400)
+        set_device_sites(device_id, sorted(set(sites)))
+
+    return Response({"device_id": device_id, "sites": sites_for_device(device_id)})
@@ -0,0 +1,47 @@
+import hmac
+
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from employees import lookups, metrics, warmup
+from pyauth.auth import HasRolePermission
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def readiness(request):
+    """
+    Readiness probe: 503 until the face models are loaded and warmed up in this worker.
+    """
+    state = warmup.status()
+    if not warmup.is_ready():
+        return Response(state, status=503)
+    return Response(state, status=200)
+
+
+@api_view(['POST'])
+@permission_classes([HasRolePermission])
+def invalidate_lookups(request):
+    """
+    Force the Global department/designation/profile maps to be rebuilt.
+    Immediate in this worker; other workers follow at their next staleness probe.
+    """
+    generation = lookups.invalidate_all()
+    return Response({"success": True, "generation": generation})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def metrics_view(request):
+    """
+    Pipeline, endpoint and Mongo metrics of this worker in Prometheus text format.
+    Requires "Authorization: Bearer <METRICS_TOKEN>"; disabled when no token is set.
+    """
+    if not metrics.METRICS_TOKEN:
+        return Response({"error": "Not found"}, status=404)
+    expected = f"Bearer {metrics.METRICS_TOKEN}"
+    if not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(), expected.encode()):
+        return Response({"error": "Invalid metrics token"}, status=401)
+    return HttpResponse(metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
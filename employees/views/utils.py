@@ -1,5 +1,6 @@
 from employees.models import Employee
-import ast
+from employees.face_gallery import gallery
+from employees.fields import unpack_encoding
 
 def save_or_update_encoding(employee_id, encoding, created_by=None, name=None, image_md5=None):
     emp, created = Employee.objects.get_or_create(
@@ -19,9 +20,10 @@ def save_or_update_encoding(employee_id, encoding, created_by=None, name=None, i
         emp.lastmodified_by = created_by
         emp.save(update_fields=['name', 'lastmodified_by', 'lastmodified_date', 'image_md5'])
 
+    gallery.upsert(emp.employee_id, emp.name, encoding, emp.is_active, emp.site)
     return emp
 
 def to_list(encoding):
-    if isinstance(encoding, str):
-        return ast.literal_eval(encoding)
-    return encoding
+    """Plain list of floats for any stored encoding format ([] when empty)."""
+    encoding = unpack_encoding(encoding)
+    return [] if encoding is None else encoding.tolist()
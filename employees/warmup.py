@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+
+# Load and exercise the face models at process start instead of on the first
+# /mark/ or /register/ request a worker handles.
+WARMUP_ON_START = os.getenv("FACE_WARMUP_ON_START", "true").lower() in ("1", "true", "yes")
+
+_ready = threading.Event()
+_state = {"status": "pending", "error": None}
+_lock = threading.Lock()
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def status():
+    return dict(_state)
+
+
+# Entry points that never serve requests, whatever their arguments
+NON_SERVING_PROGRAMS = ("pytest", "py.test", "celery")
+MANAGEMENT_PROGRAMS = ("manage.py", "django-admin", "django-admin.py", "django")
+
+
+def _program():
+    """Basename of the running program; the package name for `python -m <package>`."""
+    if not sys.argv or not sys.argv[0]:
+        return ""
+    name = os.path.basename(sys.argv[0])
+    if name == "__main__.py":
+        name = os.path.basename(os.path.dirname(sys.argv[0]))
+    return name
+
+
+def is_serving_process():
+    """
+    True in processes that serve requests (gunicorn/uvicorn workers, runserver),
+    not in test runners, celery workers or other management commands.
+    """
+    program = _program()
+    if program in NON_SERVING_PROGRAMS or "pytest" in sys.modules:
+        return False
+    if program in MANAGEMENT_PROGRAMS:
+        # Only the serving runserver process, not migrate/shell/etc. or the autoreloader parent
+        argv = sys.argv
+        if len(argv) < 2 or argv[1] != "runserver":
+            return False
+        return os.environ.get("RUN_MAIN") == "true" or "--noreload" in argv
+    return True
+
+
+def _should_warm_up():
+    return WARMUP_ON_START and is_serving_process()
+
+
+def warm_up():
+    """Load the liveness and encoding models and run one dummy inference through each."""
+    from employees import inference
+    from employees.face_utils import warm_up_models
+
+    with _lock:
+        if _ready.is_set():
+            return
+        _state.update(status="warming_up", error=None)
+        try:
+            if inference.is_enabled():
+                inference.start()  # models live in the pool processes
+            else:
+                warm_up_models()
+        except Exception as e:
+            print(f"⚠️ Face model warm-up failed: {e}")
+            _state.update(status="failed", error=str(e))
+            return
+        _state["status"] = "ready"
+        _ready.set()
+
+
+def start():
+    """Called from EmployeesConfig.ready(); runs warm_up() in a background thread."""
+    if not _should_warm_up():
+        _state["status"] = "ready"
+        _ready.set()
+        return
+    threading.Thread(target=warm_up, name="face-model-warmup", daemon=True).start()
+
+
+def _after_fork():
+    # With gunicorn --preload the parent's warm-up thread does not survive the fork
+    global _lock
+    _lock = threading.Lock()
+    if not _ready.is_set() and _should_warm_up():
+        threading.Thread(target=warm_up, name="face-model-warmup", daemon=True).start()
+
+
+os.register_at_fork(after_in_child=_after_fork)